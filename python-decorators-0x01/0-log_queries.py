@@ -1,26 +1,27 @@
-import sqlite3
-import functools
-from datetime import datetime 
+import logging
+
+# Pooled connection, so the statement stays prepared between calls
+from db_connection import with_db_connection
+from tracing import trace_queries, tracer
 
 # Decorator to log SQL queries with timestamp
-def log_queries(func):
-    @functools.wraps(func)
-    def wrapper(query, *args, **kwargs):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Executing SQL Query: {query}")
-        return func(query, *args, **kwargs)
-    return wrapper
+# Calls are recorded (timestamp, query fingerprint, duration, rows,
+# caller) into the tracer's ring buffer and written to the "queries"
+# logger by a background thread, so logging costs no I/O per call.
+# Every call is traced; lower sample_rate on hot paths. Queries over
+# slow_ms are always traced and logged as warnings.
+log_queries = trace_queries(sample_rate=1.0, slow_ms=100)
 
 @log_queries
-def fetch_all_users(query):
-    conn = sqlite3.connect('users.db')
+@with_db_connection
+def fetch_all_users(conn, query):
     cursor = conn.cursor()
     cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return cursor.fetchall()
 
 # Fetch users while logging the query
 if __name__=="__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     users = fetch_all_users("SELECT * FROM users")
-    print(users)
\ No newline at end of file
+    print(users)
+    tracer.flush()
\ No newline at end of file
@@ -1,23 +1,15 @@
-import sqlite3
 import functools
 
 # Decorator to handle opening and closing DB connection
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db") # Open connection
-        
-        try:
-            result = func(conn, *args, **kwargs) # Pass conn to the wrapped function
-        finally:
-            conn.close() # Ensure conn is always closed
-        return result
-    return wrapper 
+from db_connection import tracked, with_db_connection
+# Inside `with batch():` updates are replayed with one executemany
+from batching import batched_write
 
 # Decorator to handle transactions
 def transactional(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        conn = tracked(conn) # Commit invalidates cached reads of written tables
         try:
             result = func(conn, *args, **kwargs)
             conn.commit() # Commit if successful
@@ -26,11 +18,12 @@ def transactional(func):
             pass 
     return wrapper 
 
+@batched_write
 @with_db_connection
 @transactional
 def update_user_email(conn, user_id, new_email):
     cursor = conn.cursor()
-    cursor.execute("UPDATE users SET email = ?", (new_email, user_id))
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
     
 # Update user's email with automatic transaction handling
 if __name__ == '__main__':
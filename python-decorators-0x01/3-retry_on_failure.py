@@ -1,40 +1,63 @@
 import time
-import sqlite3
 import functools
 
-
 # Decorator to handle opening and closing DB connection
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db") # Open connection
-        
-        try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper  
+from db_connection import with_db_connection
+import retry_policy
+from circuit_breaker import circuit_breaker
+
+# Decorator to retry function on transient failure
+# Retry n waits a random time up to min(max_delay, delay * 2 ** (n - 1))
+# (full jitter, so workers don't retry in lockstep). Only errors for
+# which retry_on(error) is true are retried, and each retry spends a
+# token from budget (process-wide by default), so retries stay a
+# bounded fraction of calls. Counts and sleep time are recorded in
+# retry_policy.metrics and in the wrapper's retry_metrics.
+# retries is the total number of attempts, so it must be at least 1.
+def retry_on_failure(retries=3, delay=2, max_delay=30, budget=None,
+                     retry_on=retry_policy.is_transient):
+    if retries < 1:
+        raise ValueError(f"retries must be at least 1, got {retries}")
+    budget = retry_policy.default_budget if budget is None else budget
 
-# Decorator to retry function on failure
-def retry_on_failure(retries=3, delay=2):
     def decorator(func):
+        local_metrics = retry_policy.RetryMetrics()
+
+        def record(field, amount=1):
+            retry_policy.metrics.add(field, amount)
+            local_metrics.add(field, amount)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
+            record("calls")
+            budget.deposit()
             for attempt in range(1, retries + 1):
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    if attempt > 1:
+                        record("succeeded_after_retry")
+                    return result
                 except Exception as e:
-                    last_exception = e 
                     print(f"[Retry {attempt}/{retries}] Failed with error: {e}")
-                    if attempt < retries:
-                        time.sleep(delay)
-                # raise the last exception if all retries failed
-            raise last_exception
+                    if not retry_on(e):
+                        record("not_retryable")
+                        raise
+                    if attempt == retries:
+                        record("exhausted")
+                        raise
+                    if not budget.withdraw():
+                        record("budget_denied")
+                        raise
+                    pause = retry_policy.backoff(attempt, delay, max_delay)
+                    record("retries")
+                    record("sleep_seconds", pause)
+                    time.sleep(pause)
+        wrapper.retry_metrics = local_metrics
         return wrapper
     return decorator
 
+# Fail fast while the database is down instead of retrying every call
+@circuit_breaker()
 @with_db_connection
 @retry_on_failure(retries=3, delay=1)
 def fetch_users_with_retry(conn):
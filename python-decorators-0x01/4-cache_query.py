@@ -1,37 +1,159 @@
 #!/usr/bin/python3
 import time
-import sqlite3
+import asyncio
 import functools
+import inspect
+import sqlite3
+import threading
 
-# Simple cache dictionary with timestamp
-query_cache = {}
+from cache_engine import QueryCache
+from circuit_breaker import cached_fallback, circuit_breaker
+from sql_analysis import cache_key, tables_read
 
 # Decorator to handle opening and closing DB connection
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # open connection
+from db_connection import connect, database_path, with_db_connection
+
+# Bounded LRU/TTL cache of query results
+query_cache = QueryCache(max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300)
+
+# Background refresh tasks, kept referenced until they finish
+_refresh_tasks = set()
+
+
+def _cached_at(entry):
+    return time.strftime('%H:%M:%S', time.localtime(entry.stored_at))
+
+
+def _refresh_database(conn):
+    """Database a background refresh can reopen, or None if it can't."""
+    path = database_path(conn)
+    return None if path in (None, ":memory:") else path
+
+
+# Decorator to cache query results with timestamp
+# Usable bare (@cache_query) or with options (@cache_query(ttl=60))
+# Results are keyed by database file, normalized SQL and bound parameters
+# (any arguments after the query), so formatting variants of a query
+# share an entry and different parameters never do.
+# Concurrent misses for the same key run the query once: the first
+# caller executes it and the others wait for its result. Works for
+# plain functions called from threads and for coroutine functions.
+# With stale_ttl, an expired entry is served for up to stale_ttl more
+# seconds while a single background refresh reloads it on a fresh
+# connection to the same database.
+def cache_query(func=None, *, ttl=None, stale_ttl=None, cache=None):
+    if func is None:
+        return lambda f: cache_query(f, ttl=ttl, stale_ttl=stale_ttl, cache=cache)
+    store = query_cache if cache is None else cache
+    if inspect.iscoroutinefunction(func):
+        return _async_cache_query(func, ttl, stale_ttl, store)
+
+    def load(conn, key, query, args, kwargs):
+        tables = tables_read(query)
+        version = store.version(tables)
+        result = func(conn, query, *args, **kwargs)
+        # store result with timestamp
+        store.set(key, result, ttl, tables, stale_ttl, version)
+        return result
+
+    def refresh(database, key, query, args, kwargs):
         try:
-            result = func(conn, *args, **kwargs)  # pass conn to wrapped function
-        finally:
-            conn.close()  # ensure connection is always closed
+            conn = connect(database)
+            try:
+                store.flight.do(key, lambda: load(conn, key, query, args, kwargs))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[CACHE REFRESH FAILED] Query: {query} ({e})")
+
+    @functools.wraps(func)
+    def wrapper(conn, query, *args, **kwargs):
+        key = cache_key(query, args, kwargs, database_path(conn))
+        database = _refresh_database(conn) if stale_ttl else None
+        entry = store.lookup(key, allow_stale=database is not None)
+        if entry is not None:
+            if entry.fresh():
+                print(f"[CACHE HIT] Query: {query} (cached at {_cached_at(entry)})")
+            else:
+                print(
+                    f"[CACHE STALE] Query: {query} "
+                    f"(cached at {_cached_at(entry)}), refreshing"
+                )
+                if not store.flight.in_flight(key):
+                    threading.Thread(
+                        target=refresh,
+                        args=(database, key, query, args, kwargs),
+                        daemon=True,
+                    ).start()
+            return entry.value
+
+        def miss():
+            print(f"[CACHE MISS] Executing and caching query: {query}")
+            return load(conn, key, query, args, kwargs)
+
+        result, shared = store.flight.do(key, miss)
+        if shared:
+            print(f"[CACHE WAIT] Query: {query} (shared in-flight result)")
         return result
     return wrapper
 
-# Decorator to cache query results with timestamp
-def cache_query(func):
+
+def _async_cache_query(func, ttl, stale_ttl, store):
+    """cache_query for coroutine functions, coalescing on the event loop."""
+
+    async def load(conn, key, query, args, kwargs):
+        tables = tables_read(query)
+        version = store.version(tables)
+        result = await func(conn, query, *args, **kwargs)
+        store.set(key, result, ttl, tables, stale_ttl, version)
+        return result
+
+    async def refresh(database, key, query, args, kwargs):
+        try:
+            conn = connect(database)
+            try:
+                await store.async_flight.do(
+                    key, lambda: load(conn, key, query, args, kwargs)
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[CACHE REFRESH FAILED] Query: {query} ({e})")
+
     @functools.wraps(func)
-    def wrapper(conn, query, *args, **kwargs):
-        if query in query_cache:
-            cached_result, timestamp = query_cache[query]
-            print(f"[CACHE HIT] Query: {query} (cached at {time.strftime('%H:%M:%S', time.localtime(timestamp))})")
-            return cached_result
-        print(f"[CACHE MISS] Executing and caching query: {query}")
-        result = func(conn, query, *args, **kwargs)
-        query_cache[query] = (result, time.time())  # store result with timestamp
+    async def wrapper(conn, query, *args, **kwargs):
+        key = cache_key(query, args, kwargs, database_path(conn))
+        database = _refresh_database(conn) if stale_ttl else None
+        entry = store.lookup(key, allow_stale=database is not None)
+        if entry is not None:
+            if entry.fresh():
+                print(f"[CACHE HIT] Query: {query} (cached at {_cached_at(entry)})")
+            else:
+                print(
+                    f"[CACHE STALE] Query: {query} "
+                    f"(cached at {_cached_at(entry)}), refreshing"
+                )
+                if not store.async_flight.in_flight(key):
+                    task = asyncio.ensure_future(
+                        refresh(database, key, query, args, kwargs)
+                    )
+                    _refresh_tasks.add(task)
+                    task.add_done_callback(_refresh_tasks.discard)
+            return entry.value
+
+        async def miss():
+            print(f"[CACHE MISS] Executing and caching query: {query}")
+            return await load(conn, key, query, args, kwargs)
+
+        result, shared = await store.async_flight.do(key, miss)
+        if shared:
+            print(f"[CACHE WAIT] Query: {query} (shared in-flight result)")
         return result
     return wrapper
 
+
+# During an outage, answer from the last cached result of the query
+@circuit_breaker(fallback=cached_fallback(query_cache))
 @with_db_connection
 @cache_query
 def fetch_users_with_cache(conn, query):
@@ -48,3 +170,4 @@ if __name__ == "__main__":
     # Second call will use the cached result
     users_again = fetch_users_with_cache(query="SELECT * FROM users")
     print(users_again)
+    print(query_cache.stats())
@@ -0,0 +1,292 @@
+"""
+batching.py
+Companion decorators that batch the decorated task functions.
+Inside a `with batch():` block, calls to a batched_lookup function are
+collected and answered by one query per chunk joining the keys to the
+table, and calls to a batched_write function are recorded and replayed
+with executemany. The whole batch runs on one pooled connection in one
+transaction when the block exits (or sooner, see batch()). Outside a
+batch the decorated functions behave exactly as before.
+
+Key lists are padded to power-of-two sizes so a handful of statement
+texts cover every batch and stay in the connection's prepared
+statement cache.
+"""
+import functools
+import inspect
+import sqlite3
+import threading
+import time
+
+import db_connection
+
+# Largest key list; two variables per key stays under SQLite's
+# historical limit of 999
+MAX_BATCH_KEYS = 256
+
+_local = threading.local()
+
+
+class Pending:
+    """Result of a call made inside a batch, available once it flushes."""
+
+    __slots__ = ("_done", "_value", "_error")
+
+    def __init__(self):
+        self._done = False
+        self._value = None
+        self._error = None
+
+    def _resolve(self, value=None, error=None):
+        self._done = True
+        self._value = value
+        self._error = error
+
+    @property
+    def done(self):
+        return self._done
+
+    def result(self):
+        """The call's return value; raises its error or if not flushed yet."""
+        if not self._done:
+            raise RuntimeError("Batch has not been flushed yet")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class Batch:
+    """
+    Calls collected by batch(). Flushed when the block exits, when
+    max_size calls are pending, or on the first call after window
+    seconds have passed since the oldest pending call.
+    """
+
+    def __init__(self, max_size=500, window=None, database=None):
+        self.max_size = max_size
+        self.window = window
+        self.database = database
+        self._ops = []  # (runner, payload, pending), in call order
+        self._started = None
+
+    def add(self, runner, payload):
+        pending = Pending()
+        if not self._ops:
+            self._started = time.monotonic()
+        self._ops.append((runner, payload, pending))
+        if len(self._ops) >= self.max_size or (
+            self.window is not None and time.monotonic() - self._started >= self.window
+        ):
+            self.flush()
+        return pending
+
+    def flush(self):
+        """
+        Run every pending call in one transaction. Results are handed
+        out once it commits; if any call fails, the whole batch is
+        rolled back and every call fails with that error.
+        """
+        ops, self._ops = self._ops, []
+        if not ops:
+            return
+        results = []
+        conn = db_connection.connect(self.database)
+        try:
+            # Consecutive calls to the same function run as one statement
+            start = 0
+            while start < len(ops):
+                end = start
+                while end < len(ops) and ops[end][0] is ops[start][0]:
+                    end += 1
+                group = ops[start:end]
+                results.extend(group[0][0](conn, [op[1] for op in group]))
+                start = end
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for _, _, pending in ops:
+                pending._resolve(error=e)
+            raise
+        finally:
+            conn.close()
+        for (_, _, pending), value in zip(ops, results):
+            pending._resolve(value)
+
+    def discard(self, error):
+        ops, self._ops = self._ops, []
+        for _, _, pending in ops:
+            pending._resolve(error=error)
+
+
+class batch:
+    """
+    Context manager collecting batched calls made by this thread:
+
+        with batch() as b:
+            users = [get_user_by_id(user_id=i) for i in ids]
+        rows = [user.result() for user in users]
+
+    If the block raises, pending calls are dropped and fail with its error.
+    """
+
+    def __init__(self, max_size=500, window=None, database=None):
+        self._batch = Batch(max_size, window, database)
+
+    def __enter__(self):
+        if not hasattr(_local, "stack"):
+            _local.stack = []
+        _local.stack.append(self._batch)
+        return self._batch
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.stack.pop()
+        if exc_type is None:
+            self._batch.flush()
+        else:
+            self._batch.discard(exc_value)
+        return False
+
+
+def current_batch():
+    """The innermost active batch on this thread, or None."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def _bucket(size):
+    """Smallest power of two >= size, capped at MAX_BATCH_KEYS."""
+    bucket = 1
+    while bucket < size:
+        bucket *= 2
+    return min(bucket, MAX_BATCH_KEYS)
+
+
+def _call_key(signature, args, kwargs):
+    bound = signature.bind(None, *args, **kwargs)
+    return list(bound.arguments.values())[1]
+
+
+def batched_lookup(table, column="id"):
+    """
+    Batch single-row lookups of table by column, e.g.
+    @batched_lookup("users", "id") for "SELECT * FROM users WHERE id = ?".
+    A batch joins a VALUES list of its keys to table on column, so
+    SQLite compares each key with the column just as that query would
+    (3, "3" and 3.0 all find id 3). column should be unique. Inside a
+    batch, each call returns a Pending resolving to the matching row or
+    None. Decorate the with_db_connection function; its first argument
+    after conn is the key.
+    """
+    def statement(size):
+        return (
+            f"WITH batch_keys(arg, key) AS (VALUES {', '.join(['(?, ?)'] * size)}) "
+            f"SELECT batch_keys.arg, {table}.* FROM batch_keys "
+            f"JOIN {table} ON {table}.{column} = batch_keys.key"
+        )
+
+    def decorator(func):
+        signature = inspect.signature(inspect.unwrap(func))
+
+        def run(conn, keys):
+            rows = {}
+            cursor = conn.cursor()
+            for start in range(0, len(keys), MAX_BATCH_KEYS):
+                chunk = list(enumerate(keys[start:start + MAX_BATCH_KEYS], start))
+                size = _bucket(len(chunk))
+                chunk += [(-1, None)] * (size - len(chunk))  # pad; NULL never matches
+                cursor.execute(statement(size), [v for pair in chunk for v in pair])
+                for row in cursor.fetchall():
+                    rows.setdefault(row[0], row[1:])
+            return [rows.get(index) for index in range(len(keys))]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = current_batch()
+            if active is None:
+                return func(*args, **kwargs)
+            return active.add(run, _call_key(signature, args, kwargs))
+        return wrapper
+    return decorator
+
+
+class _RecordingCursor:
+    """Cursor that records statements instead of running them."""
+
+    def __init__(self, statements):
+        self._statements = statements
+
+    def execute(self, sql, parameters=()):
+        self._statements.append((sql, tuple(parameters)))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        for parameters in seq_of_parameters:
+            self.execute(sql, parameters)
+        return self
+
+    def _no_results(self, *args):
+        raise sqlite3.ProgrammingError("batched_write functions cannot read results")
+
+    fetchone = fetchmany = fetchall = __iter__ = _no_results
+
+
+class _RecordingConnection:
+    """Connection handed to batched_write functions while recording."""
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return _RecordingCursor(self.statements)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def batched_write(func):
+    """
+    Batch write functions such as update_user_email. Inside a batch the
+    undecorated function body runs against a recording connection; its
+    statements are replayed on flush, consecutive runs of the same SQL
+    as one executemany. The batch supplies the connection and the
+    transaction, so decorators between this one and the function body
+    (with_db_connection, transactional) are skipped. Each call returns
+    a Pending resolving to the function's return value.
+    """
+    body = inspect.unwrap(func)
+
+    def run(conn, calls):
+        statements = []
+        results = []
+        for args, kwargs in calls:
+            recorder = _RecordingConnection()
+            results.append(body(recorder, *args, **kwargs))
+            statements.extend(recorder.statements)
+        cursor = conn.cursor()
+        start = 0
+        while start < len(statements):
+            end = start
+            while end < len(statements) and statements[end][0] == statements[start][0]:
+                end += 1
+            cursor.executemany(
+                statements[start][0], [s[1] for s in statements[start:end]]
+            )
+            start = end
+        return results
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        active = current_batch()
+        if active is None:
+            return func(*args, **kwargs)
+        return active.add(run, (args, kwargs))
+    return wrapper
@@ -0,0 +1,328 @@
+"""
+cache_engine.py
+Bounded query result cache used by the cache_query decorator:
+LRU eviction by entry count and by estimated result size, per-entry
+TTL with an optional stale window, hit/miss/eviction counters,
+invalidation of entries by the tables their queries read, and
+single-flight coalescing of concurrent misses.
+"""
+import asyncio
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from sql_analysis import ALL_TABLES
+
+# Every QueryCache, so writes can invalidate all of them
+_caches = weakref.WeakSet()
+
+
+class CacheEntry:
+    """A cached result with its size estimate and timestamps."""
+
+    __slots__ = ("value", "size", "stored_at", "expires_at", "stale_until", "tables")
+
+    def __init__(self, value, size, stored_at, expires_at, stale_until, tables):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.tables = tables
+
+    def fresh(self, now=None):
+        """True until the entry's TTL has passed."""
+        if self.expires_at is None:
+            return True
+        return self.expires_at > (time.monotonic() if now is None else now)
+
+
+def result_size(value):
+    """
+    Approximate memory footprint of a query result in bytes: the list,
+    each row tuple and each column value.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, (list, tuple)):
+                size += sum(sys.getsizeof(column) for column in row)
+    return size
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results.
+    Entries expire ttl seconds after being stored (None never expires);
+    the least recently used entries are evicted once max_entries or
+    max_bytes is exceeded. Results larger than max_bytes are not cached.
+    Entries stored with a stale_ttl stay servable for that long after
+    expiring, for callers that ask for stale entries while refreshing.
+    Entries record the tables their query reads; invalidate_tables()
+    drops those entries when a table is written. Entries stored without
+    tables are dropped by any write.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_table = {}  # table -> keys of entries reading it
+        self._bytes = 0
+        self._versions = {}  # table -> number of invalidations
+        self._epoch = 0  # bumped when the whole cache is invalidated
+        self._lock = threading.RLock()
+        self.flight = SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        _caches.add(self)
+
+    def lookup(self, key, allow_stale=False):
+        """
+        Return the live CacheEntry for key, or None on a miss. With
+        allow_stale, expired entries still inside their stale window are
+        returned too; check entry.fresh() to tell them apart.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            stale = entry is not None and not entry.fresh(now)
+            if stale and not (allow_stale and entry.stale_until > now):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default."""
+        entry = self.lookup(key)
+        return default if entry is None else entry.value
+
+    def peek(self, key):
+        """
+        Return the CacheEntry for key even if it has expired, without
+        touching counters or LRU order (for serving during outages).
+        Invalidated entries are gone and return None.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def version(self, tables):
+        """
+        Snapshot of the invalidation counters for tables. Take it before
+        running a query and pass it to set() so a result computed while
+        one of its tables was written is not cached.
+        """
+        tables = frozenset(tables) if tables else ALL_TABLES
+        with self._lock:
+            return (self._epoch,) + tuple(
+                self._versions.get(table, 0) for table in sorted(tables)
+            )
+
+    def set(self, key, value, ttl=None, tables=None, stale_ttl=None, version=None):
+        """
+        Store value under key, evicting LRU entries to stay in bounds.
+        tables are the names of the tables the query reads; stale_ttl is
+        how long the entry may be served stale after ttl. Nothing is
+        stored if version no longer matches version(tables).
+        """
+        size = result_size(value)
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        tables = frozenset(tables) if tables else ALL_TABLES
+        with self._lock:
+            if version is not None and version != self.version(tables):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+            expires_at = None if ttl is None else now + ttl
+            stale_until = expires_at
+            if expires_at is not None and stale_ttl:
+                stale_until = expires_at + stale_ttl
+            self._entries[key] = CacheEntry(
+                value, size, time.time(), expires_at, stale_until, tables
+            )
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+        return entry
+
+    def invalidate_tables(self, tables):
+        """
+        Drop entries whose queries read any of tables (and entries with
+        unknown tables). ALL_TABLES clears the cache. Returns the number
+        of entries dropped.
+        """
+        with self._lock:
+            if ALL_TABLES <= frozenset(tables):
+                dropped = len(self._entries)
+                self.clear()
+            else:
+                keys = set(self._by_table.get("*", ()))
+                for table in {"*"} | {table.lower() for table in tables}:
+                    self._versions[table] = self._versions.get(table, 0) + 1
+                    keys |= self._by_table.get(table, set())
+                for key in keys:
+                    self._remove(key)
+                dropped = len(keys)
+            self.invalidations += dropped
+            return dropped
+
+    def invalidate(self, key):
+        """Drop one entry; returns True if it was cached."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        """Counters and current size of the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.flight.coalesced + self.async_flight.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class _Call:
+    """An in-flight SingleFlight call and its outcome."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key across threads: the
+    first caller runs the function, later callers wait for its result
+    (or exception) instead of running it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    def do(self, key, fn):
+        """Return (fn() result, shared) where shared is True for waiters."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: callers on one event loop share a call."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        return (asyncio.get_running_loop(), key) in self._calls
+
+    async def do(self, key, fn):
+        """
+        Await fn() once per key; returns (result, shared). fn() runs as
+        its own task that every caller awaits through asyncio.shield, so
+        cancelling one caller never cancels the others.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        task = self._calls.get(slot)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = self._calls[slot] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(slot, None))
+            # Callers may all be gone; don't warn about an unretrieved error
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task), shared
+
+
+def invalidate_tables(tables):
+    """Invalidate cached reads of tables in every QueryCache."""
+    if not tables:
+        return 0
+    return sum(cache.invalidate_tables(tables) for cache in list(_caches))
@@ -0,0 +1,231 @@
+"""
+circuit_breaker.py
+Circuit breaker decorator for database calls. While the database is
+failing, calls fail immediately (or are answered from a fallback such
+as cached query results) instead of waiting on connections and retries.
+
+Stack it outside with_db_connection and retry_on_failure so an open
+circuit skips both:
+
+    @circuit_breaker(fallback=cached_fallback(query_cache))
+    @with_db_connection
+    @retry_on_failure()
+    def fetch(conn, query): ...
+"""
+import functools
+import sqlite3
+import threading
+import time
+
+import db_connection
+import retry_policy
+from sql_analysis import cache_key
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# mysql.connector errno values for a server that can't be reached
+UNREACHABLE_MYSQL_ERRNOS = frozenset([2003, 2005])
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling through while the circuit is open."""
+
+
+def is_outage(error):
+    """True if error suggests the database is unavailable, not misused."""
+    if retry_policy.is_transient(error):
+        return True
+    if isinstance(error, sqlite3.OperationalError):
+        message = str(error).lower()
+        return "unable to open" in message or "disk i/o" in message
+    return getattr(error, "errno", None) in UNREACHABLE_MYSQL_ERRNOS
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through; outcomes are counted in a sliding window
+    of window seconds split into buckets. Once at least min_calls were
+    made in the window and the share of failures reaches failure_rate,
+    the circuit opens.
+    Open: calls fail fast (or use the fallback) for reset_timeout
+    seconds, then the circuit goes half-open.
+    Half-open: up to half_open_calls trial calls go through at a time;
+    a successful trial closes the circuit, a failed one opens it again.
+    Calls admitted before the circuit opened only update the counts.
+    Only errors for which is_failure(error) is true count as failures;
+    other errors still propagate. With a fallback, rejected calls and
+    calls failing with a counted error are answered by
+    fallback(*args, **kwargs) when it can.
+    """
+
+    def __init__(self, name=None, failure_rate=0.5, min_calls=5, window=30.0,
+                 buckets=10, reset_timeout=15.0, half_open_calls=1,
+                 is_failure=is_outage, fallback=None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.is_failure = is_failure
+        self.fallback = fallback
+        self._width = window / buckets
+        self._buckets = [[-1, 0, 0] for _ in range(buckets)]  # [index, calls, failures]
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self._period = 0  # bumped on every open; tags half-open trials
+        self.metrics = {
+            "calls": 0, "failures": 0, "rejected": 0, "fallbacks": 0, "opened": 0
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        """State after applying the open -> half-open timeout (lock held)."""
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    def _window_counts(self, now):
+        current = int(now / self._width)
+        calls = failures = 0
+        for index, bucket_calls, bucket_failures in self._buckets:
+            if current - index < len(self._buckets):
+                calls += bucket_calls
+                failures += bucket_failures
+        return calls, failures
+
+    def _record(self, now, failed):
+        index = int(now / self._width)
+        bucket = self._buckets[index % len(self._buckets)]
+        if bucket[0] != index:
+            bucket[:] = [index, 0, 0]
+        bucket[1] += 1
+        bucket[2] += failed
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._period += 1
+        self.metrics["opened"] += 1
+        print(f"[CIRCUIT OPEN] {self.name}: failing fast for {self.reset_timeout}s")
+
+    def _close(self):
+        self._state = CLOSED
+        self._buckets = [[-1, 0, 0] for _ in self._buckets]
+        print(f"[CIRCUIT CLOSED] {self.name}: calls resumed")
+
+    def _admit(self):
+        """
+        Decide whether a call may go through. Returns None if it is
+        rejected, the current open period if it is a half-open trial,
+        and 0 for an ordinary call.
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return 0
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return self._period
+            self.metrics["rejected"] += 1
+            return None
+
+    def _on_result(self, failed, trial=0):
+        now = time.monotonic()
+        with self._lock:
+            self.metrics["calls"] += 1
+            self.metrics["failures"] += failed
+            if trial and trial == self._period and self._state == HALF_OPEN:
+                self._trials -= 1
+                if failed:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+            self._record(now, failed)
+            if failed and self._state == CLOSED:
+                calls, failures = self._window_counts(now)
+                if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                    self._open(now)
+
+    def _reject(self, args, kwargs):
+        if self.fallback is not None:
+            try:
+                result = self.fallback(*args, **kwargs)
+            except CircuitOpenError:
+                pass
+            else:
+                with self._lock:
+                    self.metrics["fallbacks"] += 1
+                return result
+        raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def __call__(self, func):
+        if self.name is None:
+            self.name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trial = self._admit()
+            if trial is None:
+                return self._reject(args, kwargs)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                failed = self.is_failure(e)
+                self._on_result(failed, trial)
+                if failed and self.fallback is not None:
+                    try:
+                        return self._reject(args, kwargs)
+                    except CircuitOpenError:
+                        pass
+                raise
+            except BaseException:
+                # KeyboardInterrupt, SystemExit: a trial still gives its
+                # slot back, as a failure, or the circuit stays half-open
+                if trial:
+                    self._on_result(True, trial)
+                raise
+            self._on_result(False, trial)
+            return result
+        wrapper.breaker = self
+        return wrapper
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["state"] = self._current_state(time.monotonic())
+            stats["window_calls"], stats["window_failures"] = \
+                self._window_counts(time.monotonic())
+        return stats
+
+
+def circuit_breaker(**options):
+    """Decorator factory: @circuit_breaker(failure_rate=0.5, ...)."""
+    return CircuitBreaker(**options)
+
+
+def cached_fallback(cache, database=None):
+    """
+    Fallback answering a cache_query-decorated call from cache: the last
+    stored result for the same query and parameters, even if expired.
+    Results invalidated by writes are not served. Raises
+    CircuitOpenError when nothing is cached.
+    """
+    def fallback(query, *args, **kwargs):
+        key = cache_key(query, args, kwargs, database or db_connection.DB_PATH)
+        entry = cache.peek(key)
+        if entry is None:
+            raise CircuitOpenError(f"Circuit is open and no cached result for: {query}")
+        print(f"[CIRCUIT FALLBACK] Serving cached result for: {query}")
+        return entry.value
+    return fallback
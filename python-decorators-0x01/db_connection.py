@@ -0,0 +1,149 @@
+"""
+db_connection.py
+Shared with_db_connection decorator for the decorator tasks, and the
+connection wrapper it hands to decorated functions. The wrapper
+records which tables each statement writes and, once those writes are
+committed, invalidates cached query results that read those tables.
+Connections come from a shared pool (see pool.py) and go back to it
+when the decorated function returns.
+"""
+import functools
+import sqlite3
+
+import cache_engine
+import pool
+import sql_analysis
+
+DB_PATH = "users.db"
+
+# Options for the pool behind connect(), e.g. {"max_size": 10}
+POOL_OPTIONS = {}
+
+
+class TrackingCursor:
+    """sqlite3 cursor proxy that reports written tables to its connection."""
+
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, sql, parameters=()):
+        self._cursor.execute(sql, parameters)
+        self._connection._track(sql)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._cursor.executemany(sql, seq_of_parameters)
+        self._connection._track(sql)
+        return self
+
+    def executescript(self, script):
+        self._cursor.executescript(script)
+        self._connection._track(script)
+        return self
+
+
+class TrackingConnection:
+    """
+    sqlite3 connection proxy. Tables written since the last commit are
+    invalidated in every QueryCache when commit() succeeds, or right
+    away when the connection is in autocommit mode. Rolled back writes
+    invalidate nothing.
+    """
+
+    def __init__(self, connection, database=None):
+        self._connection = connection
+        self._written = set()
+        self.database = database
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def _track(self, sql):
+        tables = sql_analysis.tables_written(sql)
+        if not tables:
+            return
+        self._written |= tables
+        if not self._connection.in_transaction:
+            # Autocommit (or DDL outside a transaction): already durable
+            self._flush()
+
+    def _flush(self):
+        written, self._written = self._written, set()
+        cache_engine.invalidate_tables(written)
+
+    def cursor(self, *args, **kwargs):
+        return TrackingCursor(self._connection.cursor(*args, **kwargs), self)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        self._connection.commit()
+        self._flush()
+
+    def rollback(self):
+        self._connection.rollback()
+        self._written = set()
+
+    def close(self):
+        self._written = set()
+        self._connection.close()
+
+
+def tracked(conn):
+    """Wrap conn in a TrackingConnection unless it already is one."""
+    if isinstance(conn, TrackingConnection):
+        return conn
+    return TrackingConnection(conn, database_path(conn))
+
+
+def database_path(conn):
+    """
+    File behind a connection's main database: the path it was opened
+    with, or SQLite's own record of it for plain sqlite3 connections.
+    """
+    database = getattr(conn, "database", None)
+    if database:
+        return database
+    try:
+        for _, name, path in conn.execute("PRAGMA database_list").fetchall():
+            if name == "main":
+                return path or ":memory:"
+    except sqlite3.Error:
+        pass
+    return None
+
+
+def connect(database=None):
+    """
+    Check out a pooled TrackingConnection on database (DB_PATH by
+    default); close() returns it to the pool.
+    """
+    database = database or DB_PATH
+    return TrackingConnection(pool.connect(database, **POOL_OPTIONS), database)
+
+
+# Decorator to handle opening and closing DB connection
+def with_db_connection(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        conn = connect()  # check out a pooled connection
+        try:
+            result = func(conn, *args, **kwargs)  # pass conn to wrapped function
+        finally:
+            conn.close()  # always return it to the pool
+        return result
+    return wrapper
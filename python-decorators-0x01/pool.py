@@ -0,0 +1,206 @@
+"""
+pool.py
+Thread-safe SQLite connection pool behind with_db_connection.
+Connections are opened once per pool slot and tuned with PRAGMAs (WAL
+journal, page cache, mmap, busy timeout), then reused across calls so
+the schema, page cache and prepared statement cache stay warm. A
+thread gets back the connection it used last when that one is idle.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# Applied to every new connection. WAL lets readers run alongside one
+# writer; synchronous=NORMAL is durable across application crashes in
+# WAL mode and avoids an fsync per commit.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # KiB (negative) -> 16 MiB page cache
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No pooled connection became free within checkout_timeout."""
+
+
+class PooledConnection:
+    """
+    Proxy for a pooled sqlite3 connection. Everything is delegated to the
+    real connection except close(), which returns it to the pool.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool of at most max_size sqlite3 connections to one database file.
+    acquire() prefers the idle connection last released by the calling
+    thread, then the most recently released one, then opens a new one
+    while under max_size, and otherwise waits up to checkout_timeout.
+    Released connections have any open transaction rolled back.
+    """
+
+    def __init__(self, database, max_size=5, checkout_timeout=10,
+                 busy_timeout=5.0, cached_statements=256, pragmas=None):
+        self.database = database
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._lock = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []  # (connection, owner thread id), most recent last
+        self._open = 0
+        self.metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "same_thread_reuse": 0,
+            "wait_seconds_total": 0.0,
+        }
+
+    def _open_connection(self):
+        connection = sqlite3.connect(
+            self.database, timeout=self.busy_timeout, check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}").fetchall()
+        return connection
+
+    def acquire(self):
+        """Check out a connection for the calling thread."""
+        start = time.perf_counter()
+        deadline = start + self.checkout_timeout
+        owner = threading.get_ident()
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: connections belong to the parent process
+                self._reset()
+            while True:
+                connection = self._take_idle(owner)
+                if connection is not None:
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise PoolTimeout("Timed out waiting for a pooled connection")
+                self._lock.wait(remaining)
+
+        if connection is None:
+            try:
+                connection = self._open_connection()
+            except sqlite3.Error:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self.metrics["created"] += 1
+
+        with self._lock:
+            self.metrics["checkouts"] += 1
+            self.metrics["wait_seconds_total"] += time.perf_counter() - start
+        return PooledConnection(self, connection)
+
+    def _take_idle(self, owner):
+        """Pop the caller's own idle connection, else the newest (lock held)."""
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index][1] == owner:
+                self.metrics["same_thread_reuse"] += 1
+                return self._idle.pop(index)[0]
+        if self._idle:
+            return self._idle.pop()[0]
+        return None
+
+    def release(self, connection):
+        """Return a connection to the pool, rolling back open transactions."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+                self._idle.append((connection, threading.get_ident()))
+            except sqlite3.Error:
+                self._open -= 1
+                connection.close()
+            self._lock.notify()
+
+    def stats(self):
+        """Snapshot of pool size and checkout metrics."""
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+        return stats
+
+    def close_all(self):
+        """Close every idle connection, letting SQLite refresh its statistics."""
+        with self._lock:
+            for connection, _ in self._idle:
+                try:
+                    connection.execute("PRAGMA optimize")
+                except sqlite3.Error:
+                    pass
+                connection.close()
+                self._open -= 1
+            self._idle = []
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, **options):
+    """
+    Return the shared pool for database and options. The pool size
+    defaults to DB_POOL_SIZE from the environment.
+    """
+    if database != ":memory:":
+        database = os.path.abspath(database)
+    key = (database, repr(sorted(options.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options.setdefault("max_size", int(os.getenv("DB_POOL_SIZE", "5")))
+            pool = _pools[key] = ConnectionPool(database, **options)
+        return pool
+
+
+def connect(database, **options):
+    """Check out a pooled connection; close() returns it to the pool."""
+    return get_pool(database, **options).acquire()
+
+
+def close_all():
+    """Close the idle connections of every pool."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
@@ -0,0 +1,96 @@
+"""
+retry_policy.py
+Building blocks for retry_on_failure: which errors are worth retrying,
+exponential backoff with full jitter, a process-wide retry budget so
+retries stay a bounded fraction of calls, and retry metrics.
+"""
+import random
+import sqlite3
+import threading
+
+# SQLite errors that clear up on their own once another connection
+# finishes its write (compared against the lower-cased message)
+TRANSIENT_SQLITE_MESSAGES = (
+    "database is locked",
+    "database table is locked",
+    "database schema is locked",
+    "timed out waiting for a pooled connection",
+)
+
+# mysql.connector errno values for lost connections, lock timeouts
+# and deadlocks
+TRANSIENT_MYSQL_ERRNOS = frozenset([1205, 1213, 2006, 2013, 2055])
+
+
+def is_transient(error):
+    """True if error is a lock, timeout or dropped connection worth retrying."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, sqlite3.OperationalError):
+        message = str(error).lower()
+        return any(text in message for text in TRANSIENT_SQLITE_MESSAGES)
+    return getattr(error, "errno", None) in TRANSIENT_MYSQL_ERRNOS
+
+
+def backoff(attempt, base, cap):
+    """
+    Full-jitter delay before retry number attempt (1-based): uniform
+    between 0 and min(cap, base * 2 ** (attempt - 1)).
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of calls. Every call
+    deposits ratio tokens, every retry spends one; the bucket holds at
+    most max_tokens and starts full.
+    """
+
+    def __init__(self, ratio=0.1, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend a token for one retry; False if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+
+class RetryMetrics:
+    """Thread-safe counters for calls made through retry_on_failure."""
+
+    FIELDS = (
+        "calls", "retries", "succeeded_after_retry", "exhausted",
+        "budget_denied", "not_retryable", "sleep_seconds",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+# Shared by every retry_on_failure decorator unless one is passed in
+default_budget = RetryBudget()
+metrics = RetryMetrics()
@@ -0,0 +1,133 @@
+"""
+sql_analysis.py
+Lightweight SQL inspection for the caching decorators: which tables a
+statement reads and which it writes, and normalized fingerprints used
+as cache keys.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+
+import sqlparse
+from sqlparse import tokens as T
+
+# Returned by tables_written when a statement writes but its target
+# table cannot be determined; callers should invalidate everything.
+ALL_TABLES = frozenset(["*"])
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NAME = r"((?:[`\"\[]?\w+[`\"\]]?\.)?[`\"\[]?\w+[`\"\]]?)"
+_CLAUSE_WORDS = (
+    r"WHERE|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|OUTER|ON|USING|GROUP"
+    r"|ORDER|HAVING|LIMIT|OFFSET|UNION|EXCEPT|INTERSECT|WINDOW|RETURNING"
+)
+# A table in a FROM list with an optional alias: `users`, `users AS u`
+_TABLE_REF = (
+    r"(?:[`\"\[]?\w+[`\"\]]?\.)?[`\"\[]?\w+[`\"\]]?"
+    r"(?:\s+(?:AS\s+)?(?!(?:" + _CLAUSE_WORDS + r")\b)\w+)?"
+)
+_FROM_RE = re.compile(
+    r"\bFROM\s+(" + _TABLE_REF + r"(?:\s*,\s*" + _TABLE_REF + r")*)", re.I
+)
+_JOIN_RE = re.compile(r"\bJOIN\s+" + _NAME, re.I)
+# A derived table (FROM (SELECT ...) alias, ...) hides the rest of its list
+_DERIVED_RE = re.compile(r"\bFROM\s*\(", re.I)
+_WRITE_RE = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?"
+    r"|DELETE\s+FROM|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|ALTER\s+TABLE"
+    r"|CREATE\s+(?:TEMP\w*\s+)?TABLE(?:\s+IF\s+NOT\s+EXISTS)?|TRUNCATE(?:\s+TABLE)?)\s+"
+    + _NAME,
+    re.I,
+)
+_WRITE_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER", "TRUNCATE",
+}
+
+
+def _strip(sql):
+    """Remove comments and string literals so they are not parsed as SQL."""
+    return _STRING_RE.sub("''", _COMMENT_RE.sub(" ", sql))
+
+
+def _table_name(raw):
+    name = raw.split(".")[-1]
+    return name.strip('`"[]').lower()
+
+
+def tables_read(sql):
+    """
+    Names of tables a statement reads (FROM lists and JOIN clauses).
+    Returns ALL_TABLES when a FROM clause starts with a derived table,
+    whose siblings in the list can't be found reliably.
+    """
+    stripped = _strip(sql)
+    if _DERIVED_RE.search(stripped):
+        return ALL_TABLES
+    tables = {_table_name(name) for name in _JOIN_RE.findall(stripped)}
+    for from_list in _FROM_RE.findall(stripped):
+        tables.update(_table_name(ref.split()[0]) for ref in from_list.split(","))
+    return frozenset(tables)
+
+
+def is_write(sql):
+    """True if the statement can modify data or schema."""
+    words = set(re.findall(r"[A-Za-z_]+", _strip(sql).upper()))
+    return bool(words & _WRITE_KEYWORDS)
+
+
+def tables_written(sql):
+    """
+    Names of tables a statement writes. Returns ALL_TABLES for a write
+    whose target could not be found, and an empty set for reads.
+    """
+    stripped = _strip(sql)
+    tables = frozenset(_table_name(name) for name in _WRITE_RE.findall(stripped))
+    if tables:
+        return tables
+    return ALL_TABLES if is_write(stripped) else frozenset()
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """
+    Normalize a statement so formatting variants share one cache key:
+    comments dropped, whitespace collapsed, keywords upper-cased and
+    unquoted identifiers lower-cased (SQLite compares them without
+    case). String literals and quoted identifiers are kept as written.
+    """
+    parts = []
+    for statement in sqlparse.parse(sql):
+        for token in statement.flatten():
+            if token.ttype in T.Comment or token.ttype in T.Whitespace \
+                    or token.ttype in T.Newline:
+                if parts and parts[-1] != " ":
+                    parts.append(" ")
+            elif token.ttype in T.Keyword or token.ttype in T.Name.Builtin:
+                parts.append(token.normalized.upper())
+            elif token.ttype in T.Name:
+                parts.append(token.value.lower())
+            else:
+                parts.append(token.value)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def params_digest(args=(), kwargs=None):
+    """Stable hash of bound parameters (positional and keyword)."""
+    payload = json.dumps(
+        [list(args), sorted((kwargs or {}).items())],
+        default=repr, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(sql, args=(), kwargs=None, database=None):
+    """
+    Cache key for a query: database path, SQL fingerprint and a digest
+    of its bound parameters.
+    """
+    if database and database != ":memory:":
+        database = os.path.abspath(database)
+    return (database, fingerprint(sql), params_digest(args, kwargs))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Unit test module for the batch(), batched_lookup and batched_write
+decorators in batching.
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from parameterized import parameterized
+
+import db_connection
+import pool
+from batching import batch, batched_lookup, batched_write
+from db_connection import with_db_connection
+
+
+@batched_lookup("users", "id")
+@with_db_connection
+def get_user_by_id(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+@batched_write
+@with_db_connection
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+@batched_write
+@with_db_connection
+def add_user(conn, user_id, name, email):
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO users (id, name, email) VALUES (?, ?, ?)", (user_id, name, email)
+    )
+
+
+class BatchingTestCase(unittest.TestCase):
+    """Runs each test against a fresh users table in a temporary file."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT UNIQUE)"
+        )
+        conn.executemany(
+            "INSERT INTO users VALUES (?, ?, ?)",
+            [(i, f"user{i}", f"user{i}@example.com") for i in range(1, 6)],
+        )
+        conn.commit()
+        conn.close()
+        self._db_path = db_connection.DB_PATH
+        db_connection.DB_PATH = self.path
+
+    def tearDown(self):
+        db_connection.DB_PATH = self._db_path
+        pool.close_all()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def email(self, user_id):
+        conn = sqlite3.connect(self.path)
+        try:
+            row = conn.execute(
+                "SELECT email FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+
+class TestBatchedLookup(BatchingTestCase):
+    """Test class for batching.batched_lookup"""
+
+    @parameterized.expand(
+        [
+            ("int", 3),
+            ("text", "3"),
+            ("float", 3.0),
+            ("bool", True),
+            ("missing", 9),
+            ("null", None),
+            ("non_numeric_text", "three"),
+        ]
+    )
+    def test_matches_unbatched(self, _, key):
+        """Test that every key type resolves as the unbatched call does."""
+        expected = get_user_by_id(key)
+        with batch():
+            pending = get_user_by_id(key)
+        self.assertEqual(pending.result(), expected)
+
+    def test_mixed_and_duplicate_keys(self):
+        """Test that one batch answers repeated keys of mixed types."""
+        keys = [3, "3", 3.0, 1, 1, 9, "2"]
+        with batch():
+            pendings = [get_user_by_id(user_id=key) for key in keys]
+        self.assertEqual(
+            [pending.result() for pending in pendings],
+            [get_user_by_id(user_id=key) for key in keys],
+        )
+        self.assertEqual(pendings[0].result(), (3, "user3", "user3@example.com"))
+        self.assertIsNone(pendings[5].result())
+
+    def test_result_before_flush(self):
+        """Test that a pending result is unavailable inside the block."""
+        with batch():
+            pending = get_user_by_id(1)
+            with self.assertRaises(RuntimeError):
+                pending.result()
+        self.assertEqual(pending.result()[0], 1)
+
+
+class TestBatchedWrite(BatchingTestCase):
+    """Test class for batching.batched_write and Batch.flush"""
+
+    def test_writes_commit_together(self):
+        """Test that batched writes are applied when the block exits."""
+        with batch():
+            first = update_user_email(1, "one@example.com")
+            second = update_user_email(2, "two@example.com")
+            self.assertEqual(self.email(1), "user1@example.com")
+        self.assertIsNone(first.result())
+        self.assertIsNone(second.result())
+        self.assertEqual(self.email(1), "one@example.com")
+        self.assertEqual(self.email(2), "two@example.com")
+
+    def test_failing_write_fails_the_whole_batch(self):
+        """Test that a failing write rolls back and fails earlier writes."""
+        with self.assertRaises(sqlite3.IntegrityError):
+            with batch():
+                good = update_user_email(1, "one@example.com")
+                bad = add_user(2, "duplicate", "dup@example.com")
+        for pending in (good, bad):
+            with self.assertRaises(sqlite3.IntegrityError):
+                pending.result()
+        self.assertEqual(self.email(1), "user1@example.com")
+
+    def test_block_error_discards_calls(self):
+        """Test that an exception in the block drops pending writes."""
+        with self.assertRaises(ValueError):
+            with batch():
+                pending = update_user_email(1, "one@example.com")
+                raise ValueError("boom")
+        with self.assertRaises(ValueError):
+            pending.result()
+        self.assertEqual(self.email(1), "user1@example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit test module for QueryCache and the single-flight helpers in
+cache_engine.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from cache_engine import AsyncSingleFlight, QueryCache, SingleFlight
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test class for cache_engine.QueryCache"""
+
+    def test_invalidate_tables(self):
+        """Test that a write drops only entries reading that table."""
+        cache = QueryCache()
+        cache.set("a", [1], tables={"users", "orders"})
+        cache.set("b", [2], tables={"posts"})
+        cache.invalidate_tables({"orders"})
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+
+    def test_version_guard(self):
+        """Test that results computed across a write are not stored."""
+        cache = QueryCache()
+        version = cache.version({"users"})
+        cache.invalidate_tables({"users"})
+        self.assertFalse(cache.set("k", [1], tables={"users"}, version=version))
+        version = cache.version({"users"})
+        cache.invalidate_tables({"posts"})
+        self.assertTrue(cache.set("k", [1], tables={"users"}, version=version))
+
+    def test_stale_window(self):
+        """Test that expired entries are only returned when stale is allowed."""
+        cache = QueryCache()
+        cache.set("k", [1], ttl=0.01, stale_ttl=60)
+        time.sleep(0.02)
+        entry = cache.lookup("k", allow_stale=True)
+        self.assertFalse(entry.fresh())
+        self.assertIsNone(cache.lookup("k"))
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test class for cache_engine.SingleFlight"""
+
+    def test_concurrent_calls_share_one_run(self):
+        """Test that concurrent callers run fn once and share its result."""
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def fn():
+            calls.append(1)
+            time.sleep(0.1)
+            return 42
+
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("k", fn)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [(42, False)] + [(42, True)] * 4)
+        self.assertFalse(flight.in_flight("k"))
+
+    def test_error_is_shared(self):
+        """Test that the leader's exception reaches every caller."""
+        flight = SingleFlight()
+
+        def fn():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flight.do("k", fn)
+        self.assertFalse(flight.in_flight("k"))
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    """Test class for cache_engine.AsyncSingleFlight"""
+
+    def test_concurrent_calls_share_one_run(self):
+        """Test that concurrent coroutines await a single fn() call."""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def main():
+            return await asyncio.gather(*(flight.do("k", fn) for _ in range(4)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [(42, False)] + [(42, True)] * 3)
+
+    def test_cancelling_first_caller_spares_the_rest(self):
+        """Test that cancelling the first caller doesn't cancel waiters."""
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.1)
+            return 42
+
+        async def main():
+            first = asyncio.ensure_future(flight.do("k", fn))
+            second = asyncio.ensure_future(flight.do("k", fn))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await asyncio.gather(first, second, return_exceptions=True)
+
+        first, second = asyncio.run(main())
+        self.assertIsInstance(first, asyncio.CancelledError)
+        self.assertEqual(second, (42, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit test module for the CircuitBreaker state machine in circuit_breaker.
+"""
+
+import time
+import unittest
+
+from circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError,
+)
+
+
+class Outage(Exception):
+    """Error the breakers under test count as failures."""
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test class for circuit_breaker.CircuitBreaker"""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            name="test", min_calls=2, reset_timeout=0.05,
+            is_failure=lambda e: isinstance(e, Outage),
+        )
+        self.error = None
+
+        @self.breaker
+        def call():
+            if self.error is not None:
+                raise self.error
+            return "ok"
+
+        self.call = call
+
+    def open_circuit(self):
+        self.error = Outage()
+        while self.breaker.state == CLOSED:
+            with self.assertRaises(Outage):
+                self.call()
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failures_open_the_circuit(self):
+        """Test that reaching the failure rate opens and then rejects."""
+        self.assertEqual(self.call(), "ok")
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.open_circuit()
+        self.error = None
+        with self.assertRaises(CircuitOpenError):
+            self.call()
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_other_errors_are_not_failures(self):
+        """Test that errors is_failure rejects leave the circuit closed."""
+        self.error = ValueError()
+        for _ in range(5):
+            with self.assertRaises(ValueError):
+                self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_successful_trial_closes(self):
+        """Test open -> half-open -> closed on a successful trial."""
+        self.open_circuit()
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.error = None
+        self.assertEqual(self.call(), "ok")
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_trial_reopens(self):
+        """Test open -> half-open -> open on a failed trial."""
+        self.open_circuit()
+        time.sleep(0.06)
+        with self.assertRaises(Outage):
+            self.call()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()["opened"], 2)
+
+    def test_interrupted_trial_gives_its_slot_back(self):
+        """Test that a trial ended by KeyboardInterrupt counts as failed."""
+        self.open_circuit()
+        time.sleep(0.06)
+        self.error = KeyboardInterrupt()
+        with self.assertRaises(KeyboardInterrupt):
+            self.call()
+        self.assertEqual(self.breaker.state, OPEN)
+        time.sleep(0.06)
+        self.error = None
+        self.assertEqual(self.call(), "ok")
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_interrupted_call_while_closed_is_not_counted(self):
+        """Test that interrupting an ordinary call records nothing."""
+        self.error = SystemExit()
+        for _ in range(3):
+            with self.assertRaises(SystemExit):
+                self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.stats()["calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
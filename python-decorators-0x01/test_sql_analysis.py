@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit test module for the SQL inspection helpers in sql_analysis.
+"""
+
+import unittest
+from parameterized import parameterized
+from sql_analysis import (
+    ALL_TABLES, cache_key, fingerprint, tables_read, tables_written,
+)
+
+
+class TestTablesRead(unittest.TestCase):
+    """Test class for sql_analysis.tables_read"""
+
+    @parameterized.expand(
+        [
+            ("SELECT * FROM users", {"users"}),
+            ("SELECT * FROM users, orders", {"users", "orders"}),
+            ("SELECT * FROM users u, orders AS o WHERE u.id = o.uid",
+             {"users", "orders"}),
+            ("SELECT * FROM Users JOIN posts p ON p.uid = Users.id",
+             {"users", "posts"}),
+            ("SELECT * FROM main.users", {"users"}),
+            ('SELECT * FROM "users" , `orders`', {"users", "orders"}),
+            ("SELECT * FROM users WHERE id IN (1, 2)", {"users"}),
+            ("SELECT a FROM users GROUP BY a, b ORDER BY a, b", {"users"}),
+            ("SELECT * FROM users LIMIT 1, 2", {"users"}),
+            ("SELECT 'FROM orders' FROM users -- FROM posts", {"users"}),
+        ]
+    )
+    def test_tables_read(self, sql, expected):
+        """Test that every table in FROM lists and JOINs is found."""
+        self.assertEqual(tables_read(sql), frozenset(expected))
+
+    def test_derived_table(self):
+        """Test that a FROM subquery makes the read set unknown."""
+        sql = "SELECT * FROM (SELECT * FROM a) x, b"
+        self.assertEqual(tables_read(sql), ALL_TABLES)
+
+
+class TestTablesWritten(unittest.TestCase):
+    """Test class for sql_analysis.tables_written"""
+
+    @parameterized.expand(
+        [
+            ("UPDATE users SET email = ? WHERE id = ?", {"users"}),
+            ("INSERT INTO users(name) VALUES (?)", {"users"}),
+            ("INSERT OR REPLACE INTO users VALUES (?)", {"users"}),
+            ("DELETE FROM Orders WHERE id = 1", {"orders"}),
+            ("DROP TABLE IF EXISTS posts", {"posts"}),
+            ("SELECT * FROM users", set()),
+            ("SELECT 'UPDATE users' FROM posts", set()),
+        ]
+    )
+    def test_tables_written(self, sql, expected):
+        """Test that write targets are found and reads write nothing."""
+        self.assertEqual(tables_written(sql), frozenset(expected))
+
+    def test_unknown_target(self):
+        """Test that a write with no recognisable target writes everything."""
+        self.assertEqual(tables_written("CREATE INDEX i ON users(id)"), ALL_TABLES)
+
+
+class TestFingerprint(unittest.TestCase):
+    """Test class for sql_analysis.fingerprint and cache_key"""
+
+    @parameterized.expand(
+        [
+            ("select *\n  from Users;", "SELECT * FROM users"),
+            ("SELECT * FROM users -- all\n", "SELECT * FROM users"),
+            ("SELECT count(*) FROM users WHERE age > ?",
+             "SELECT count(*) FROM users WHERE age > ?"),
+        ]
+    )
+    def test_fingerprint(self, sql, expected):
+        """Test that formatting variants normalise to one fingerprint."""
+        self.assertEqual(fingerprint(sql), expected)
+
+    def test_literals_kept(self):
+        """Test that string literals and quoted names keep their case."""
+        self.assertNotEqual(
+            fingerprint("SELECT * FROM users WHERE name = 'Bob'"),
+            fingerprint("SELECT * FROM users WHERE name = 'bob'"),
+        )
+        self.assertEqual(fingerprint('SELECT "Name" FROM t'), 'SELECT "Name" FROM t')
+
+    def test_cache_key(self):
+        """Test that parameters and database are part of the key."""
+        sql = "SELECT * FROM users WHERE id = ?"
+        key = cache_key(sql, (1,), None, "users.db")
+        self.assertEqual(key, cache_key(sql.lower(), [1], {}, "./users.db"))
+        self.assertNotEqual(key, cache_key(sql, (2,), None, "users.db"))
+        self.assertNotEqual(key, cache_key(sql, (1,), None, "other.db"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+tracing.py
+Low-overhead query tracing. The trace_queries decorator times each
+call and appends a small tuple to a bounded ring buffer; a background
+thread drains the buffer every interval seconds, fingerprints the SQL
+and hands structured records to a sink (the "queries" logger by
+default). Sampling keeps the share of traced calls down, while calls
+slower than the slow-query threshold are always recorded.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+from sql_analysis import fingerprint
+
+logger = logging.getLogger("queries")
+
+
+def log_sink(records):
+    """Default sink: one JSON line per record, slow queries as warnings."""
+    for record in records:
+        level = logging.WARNING if record["slow"] else logging.INFO
+        logger.log(level, json.dumps(record, default=str))
+
+
+class QueryTracer:
+    """
+    Ring buffer of trace records plus the thread that flushes it.
+    deque.append and popleft are atomic in CPython, so recording takes
+    no lock; once capacity records are pending the oldest are dropped.
+    """
+
+    def __init__(self, capacity=8192, interval=1.0, sink=log_sink):
+        self.capacity = capacity
+        self.interval = interval
+        self.sink = sink
+        self._buffer = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.flushed = 0
+
+    def record(self, started, query, seconds, rows, caller, error, slow):
+        self._buffer.append((started, query, seconds, rows, caller, error, slow))
+        if self._pid != os.getpid():
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="query-tracer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._wake.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[TRACE FLUSH FAILED] {e}")
+
+    def flush(self):
+        """Drain the buffer into the sink; returns the number of records."""
+        records = []
+        try:
+            while True:
+                entry = self._buffer.popleft()
+                started, query, seconds, rows, caller, error, slow = entry
+                records.append({
+                    "ts": started,
+                    "fingerprint": fingerprint(query) if query else None,
+                    "duration_ms": round(seconds * 1000, 3),
+                    "rows": rows,
+                    "caller": "%s:%d" % caller,
+                    "error": error,
+                    "slow": slow,
+                })
+        except IndexError:
+            pass
+        if records:
+            self.sink(records)
+            self.flushed += len(records)
+        return len(records)
+
+    def stop(self):
+        """Stop the flush thread and write out what is left."""
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self.flush()
+
+    def stats(self):
+        return {"pending": len(self._buffer), "flushed": self.flushed}
+
+
+tracer = QueryTracer()
+atexit.register(tracer.stop)
+_default_tracer = tracer
+
+
+def _row_count(result):
+    return len(result) if isinstance(result, (list, tuple)) else None
+
+
+def trace_queries(func=None, *, sample_rate=1.0, slow_ms=100, tracer=None):
+    """
+    Decorator tracing calls whose first argument (or query=) is the SQL.
+    A sample_rate share of calls is recorded, plus every call taking at
+    least slow_ms milliseconds (None disables the slow-query rule).
+    Usable bare (@trace_queries) or with options.
+    """
+    if func is None:
+        return lambda f: trace_queries(
+            f, sample_rate=sample_rate, slow_ms=slow_ms, tracer=tracer
+        )
+    sink = _default_tracer if tracer is None else tracer
+    slow_seconds = None if slow_ms is None else slow_ms / 1000
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.time()
+        start = time.perf_counter()
+        error = None
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            slow = slow_seconds is not None and seconds >= slow_seconds
+            if slow or sample_rate >= 1 or random.random() < sample_rate:
+                caller = sys._getframe(1)
+                query = kwargs.get("query", args[0] if args else None)
+                sink.record(
+                    started,
+                    query if isinstance(query, str) else None,
+                    seconds,
+                    _row_count(result),
+                    (caller.f_code.co_filename, caller.f_lineno),
+                    error,
+                    slow,
+                )
+    return wrapper
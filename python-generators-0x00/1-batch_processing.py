@@ -2,50 +2,113 @@
 1-batch_processing.py
 Generator functions for batch processing user_data from MySQL
 """
-import os
-from dotenv import load_dotenv
-import mysql.connector
+import sys
+import time
 from mysql.connector import Error
 
+import columnar as columnar_mod
+import pool
+import pushdown as pushdown_mod
+import seed
 
-def stream_users_in_batches(batch_size):
+
+# Rows sampled per batch when estimating its size in bytes
+BYTE_SAMPLE_ROWS = 16
+
+
+def estimate_batch_bytes(batch):
+    """Estimate the in-memory size of a batch from a sample of its rows."""
+    sample = batch[:BYTE_SAMPLE_ROWS]
+    sample_bytes = sum(
+        sys.getsizeof(value)
+        for row in sample
+        for value in (row.values() if isinstance(row, dict) else row)
+    )
+    return sample_bytes * len(batch) // len(sample)
+
+
+def next_batch_size(batch_size, elapsed, batch_bytes,
+                    target_seconds=None, max_bytes=None,
+                    min_batch=1, max_batch=None):
+    """
+    Scale batch_size towards the latency target and under the byte budget.
+    The size changes by at most a factor of two per batch so one slow
+    fetch does not swing it wildly.
+    """
+    scale = 1.0
+    if target_seconds and elapsed > 0:
+        scale = target_seconds / elapsed
+    if max_bytes and batch_bytes > 0:
+        scale = min(scale, max_bytes / batch_bytes)
+    scale = min(max(scale, 0.5), 2.0)
+
+    size = max(int(batch_size * scale), min_batch)
+    if max_batch:
+        size = min(size, max_batch)
+    return size
+
+
+def stream_users_in_batches(batch_size, target_seconds=None, max_bytes=None,
+                            min_batch=1, max_batch=None, columnar=False):
     """
     Generator that yields users in batches from the user_data table.
     Each yield returns a list (batch) of rows.
+    Rows come from an unbuffered cursor, so at most one batch is held
+    in client memory.
+    With target_seconds and/or max_bytes set, batch_size is adapted after
+    every batch so fetches take about target_seconds and batches stay
+    under max_bytes.
+    With columnar=True each batch is a {column: numpy array} dict
+    (see columnar.to_columns) instead of a list of row dicts.
     """
+    if columnar:
+        columnar_mod.require_numpy()
+    adaptive = target_seconds is not None or max_bytes is not None
     try:
-        connection = mysql.connector.connect(
-            database="ALX_prodev",
-            user = os.getenv("DB_USER"),
-            password = os.getenv("DB_PASSWORD"),
-            host = os.getenv("DB_HOST")
-        )
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data;")
-        
-        batch = []
-        for row in cursor:
-            batch.append(row)
-            if len(batch) == batch_size:
-                yield batch
-                batch = []
-                
-        if batch:
-            yield batch
-        
-        cursor.close()
-        connection.close()
+        connection = pool.connect("ALX_prodev")
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=not columnar, buffered=False)
+            cursor.execute("SELECT * FROM user_data;")
+
+            while True:
+                start = time.perf_counter()
+                batch = cursor.fetchmany(batch_size)
+                elapsed = time.perf_counter() - start
+                if not batch:
+                    break
+                if columnar:
+                    yield columnar_mod.to_columns(cursor.column_names, batch)
+                else:
+                    yield batch
+                if len(batch) < batch_size:
+                    break
+                if adaptive:
+                    batch_size = next_batch_size(
+                        batch_size, elapsed, estimate_batch_bytes(batch),
+                        target_seconds, max_bytes, min_batch, max_batch
+                    )
+        finally:
+            seed.close_stream(cursor, connection)
     except Error as e:
         print(f"Error: {e}")
         return
 
-def batch_processing(batch_size):
+
+def batch_processing(batch_size, pushdown=True):
     """
     Process batches and filter users over the age of 25.
     Prints each user in that condition.
+    With pushdown the age filter runs in MySQL; pushdown=False keeps the
+    client-side filter over stream_users_in_batches.
     """
+    if pushdown:
+        for batch in pushdown_mod.stream_users_older_than(25, batch_size):
+            for user in batch:
+                print(user)
+        return
+
     for batch in stream_users_in_batches(batch_size):
         for user in batch:
             if user["age"] > 25:
-                print(user)                
-
+                print(user)
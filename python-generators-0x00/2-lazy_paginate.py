@@ -2,30 +2,206 @@
 2-lazy_paginate.py
 Implements lazy pagination using a generator
 """
+import base64
+import json
+
+from mysql.connector import errors
+
+import prefetch as prefetch_mod
 import seed
 
-def paginate_users(page_size, offset):
+# Columns that may be used as a keyset pagination key
+KEYSET_COLUMNS = ("user_id", "name", "email", "age")
+
+OFFSET_PAGE_SQL = "SELECT * FROM user_data LIMIT %s OFFSET %s"
+
+
+class PageReader:
+    """
+    Holds one connection and its prepared statements for a whole
+    pagination run. A dropped connection is re-established and the
+    failed page is fetched again.
+    """
+
+    def __init__(self, reconnect_attempts=3, reconnect_delay=1):
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.connection = seed.connect_to_prodev()
+        if self.connection is None:
+            raise errors.InterfaceError("Could not connect to ALX_prodev")
+        self.cursors = {}
+
+    def fetch(self, sql, params):
+        """Execute a page query with a cached prepared cursor."""
+        try:
+            return self._fetch(sql, params)
+        except (errors.OperationalError, errors.InterfaceError):
+            self._reconnect()
+            return self._fetch(sql, params)
+
+    def _fetch(self, sql, params):
+        cursor = self.cursors.get(sql)
+        if cursor is None:
+            cursor = self.connection.cursor(prepared=True, dictionary=True)
+            self.cursors[sql] = cursor
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def _reconnect(self):
+        self.cursors = {}
+        self.connection.reconnect(
+            attempts=self.reconnect_attempts, delay=self.reconnect_delay
+        )
+
+    def close(self):
+        for cursor in self.cursors.values():
+            try:
+                cursor.close()
+            except errors.Error:
+                pass
+        self.cursors = {}
+        self.connection.close()
+
+
+def _keyset_query(page_size, after, key):
+    """Build the seek query and parameters for one keyset page."""
+    if key not in KEYSET_COLUMNS:
+        raise ValueError(f"Unsupported pagination key: {key}")
+
+    if key == "user_id":
+        order_by = "user_id"
+        where, params = ("WHERE user_id > %s", [after]) if after else ("", [])
+    else:
+        order_by = f"{key}, user_id"
+        if after:
+            where, params = f"WHERE ({key}, user_id) > (%s, %s)", list(after)
+        else:
+            where, params = "", []
+    sql = f"SELECT * FROM user_data {where} ORDER BY {order_by} LIMIT %s"
+    return sql, params + [page_size]
+
+
+def paginate_users(page_size, offset, reader=None):
     """
     Fetch one page of users starting from offset
     """
+    if reader is not None:
+        return reader.fetch(OFFSET_PAGE_SQL, (page_size, offset))
+
     connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    if connection is None:
+        return []
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
     return rows
 
 
-def lazy_pagination(page_size):
+def paginate_users_after(page_size, after=None, key="user_id", reader=None):
+    """
+    Fetch one page of users ordered by key, seeking past the position
+    `after` instead of skipping rows with OFFSET.
+    For key columns other than user_id, `after` is a (key, user_id) pair
+    so rows sharing the same key value are never skipped.
+    """
+    sql, params = _keyset_query(page_size, after, key)
+    if reader is not None:
+        return reader.fetch(sql, params)
+
+    connection = seed.connect_to_prodev()
+    if connection is None:
+        return []
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return rows
+
+
+def encode_cursor(row, key="user_id"):
+    """
+    Build a resumable cursor token pointing just after `row`.
+    Pass it back to lazy_pagination(cursor=...) to continue from there.
+    """
+    if key == "user_id":
+        after = row["user_id"]
+    else:
+        after = [str(row[key]), row["user_id"]]
+    payload = json.dumps({"key": key, "after": after}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(token):
+    """Return (key, after) from a token produced by encode_cursor."""
+    payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    after = payload["after"]
+    return payload["key"], tuple(after) if isinstance(after, list) else after
+
+
+def page_fetcher(reader, page_size, key=None, cursor=None):
+    """
+    Return a function that fetches the next page on each call (an empty
+    list once the table is exhausted), tracking the offset or keyset
+    position between calls.
+    """
+    if key is None and cursor is None:
+        offset = 0
+
+        def next_offset_page():
+            nonlocal offset
+            page = paginate_users(page_size, offset, reader)
+            offset += page_size
+            return page
+
+        return next_offset_page
+
+    after = None
+    if cursor is not None:
+        key, after = decode_cursor(cursor)
+
+    def next_keyset_page():
+        nonlocal after
+        page = paginate_users_after(page_size, after, key, reader)
+        if page:
+            last = page[-1]
+            after = (
+                last["user_id"] if key == "user_id" else (last[key], last["user_id"])
+            )
+        return page
+
+    return next_keyset_page
+
+
+def lazy_pagination(page_size, key=None, cursor=None, prefetch=0):
     """
     Generator that lazily loads pages of users.
     Yields one page (list of users) at a time.
+    With key (or a cursor token) set, pages are fetched by keyset
+    seek on that column instead of LIMIT/OFFSET.
+    A single connection is held for the whole iteration.
+    With prefetch=N a background thread keeps up to N pages queued
+    while the caller processes the current one.
     """
-    offset = 0
-    while True:  # single loop
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
-        yield page
-        offset += page_size
\ No newline at end of file
+    if prefetch:
+        yield from prefetch_mod.prefetch(
+            lazy_pagination(page_size, key, cursor), depth=prefetch
+        )
+        return
+
+    reader = PageReader()
+    try:
+        fetch_page = page_fetcher(reader, page_size, key, cursor)
+        while True:  # single loop
+            page = fetch_page()
+            if not page:
+                break
+            yield page
+    finally:
+        reader.close()
@@ -4,6 +4,9 @@
 Memory-efficient aggregation using generators
 """
 
+import columnar
+import pool
+import pushdown as pushdown_mod
 import seed
 
 
@@ -12,20 +15,60 @@ def stream_user_ages():
     Generator that yields user ages one by one
     from the user_data table.
     """
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT age FROM user_data;")
+    connection = pool.connect("ALX_prodev")
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute("SELECT age FROM user_data;")
 
-    for row in cursor:  # loop 1
-        yield row["age"]
+        for row in cursor:  # loop 1
+            yield row["age"]
+    finally:
+        seed.close_stream(cursor, connection)
 
-    cursor.close()
-    connection.close()
+
+def stream_user_age_batches(batch_size=10000):
+    """
+    Generator that yields user ages as numpy arrays of up to
+    batch_size values.
+    """
+    columnar.require_numpy()
+    connection = pool.connect("ALX_prodev")
+    cursor = None
+    try:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("SELECT age FROM user_data;")
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield columnar.np.fromiter(
+                (age for (age,) in rows), dtype=columnar.np.float64, count=len(rows)
+            )
+    finally:
+        seed.close_stream(cursor, connection)
 
 
-def calculate_average_age():
+def age_summary(batch_size=10000, percentiles=(50, 90, 99), bucket_size=10):
     """
-    Calculate average age of users without loading all data into memory.
+    Mean, percentiles and histogram of user ages, aggregated one numpy
+    batch at a time.
+    """
+    accumulator = columnar.AgeAccumulator()
+    for ages in stream_user_age_batches(batch_size):
+        accumulator.update(ages)
+    return {
+        "count": accumulator.count,
+        "mean": accumulator.mean(),
+        "percentiles": accumulator.percentiles(percentiles),
+        "histogram": accumulator.histogram(bucket_size),
+    }
+
+
+def average_age_client_side():
+    """
+    Average age computed by streaming every age through Python.
     """
     total_age = 0
     count = 0
@@ -34,8 +77,22 @@ def calculate_average_age():
         total_age += age
         count += 1
 
-    average_age = total_age / count if count > 0 else 0
+    return total_age / count if count > 0 else 0
+
+
+def calculate_average_age(pushdown=True):
+    """
+    Calculate average age of users without loading all data into memory.
+    With pushdown the AVG runs in MySQL; the streaming path is used when
+    pushdown is disabled or the aggregate query fails.
+    """
+    stats = pushdown_mod.age_stats() if pushdown else None
+    if stats is not None:
+        average_age = stats["avg"]
+    else:
+        average_age = average_age_client_side()
     print(f"Average age of users: {average_age:.2f}")
+    return average_age
 
 
 if __name__ == "__main__":
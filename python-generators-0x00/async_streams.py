@@ -0,0 +1,120 @@
+"""
+async_streams.py
+`async for` versions of stream_users, stream_users_in_batches and
+lazy_pagination. The blocking mysql.connector calls run in a worker
+thread and the next batch or page is fetched while the consumer is
+still processing the current one.
+"""
+import asyncio
+import importlib
+from contextlib import aclosing
+
+import seed
+
+lazy_paginate = importlib.import_module("2-lazy_paginate")
+
+
+async def _prefetching(fetch, close):
+    """
+    Async generator over fetch() results, run in a thread one call
+    ahead of the consumer, until fetch() returns an empty batch.
+    Calls never overlap, so fetch may share one connection.
+    close() runs once the generator finishes or is closed early.
+    """
+    pending = asyncio.ensure_future(asyncio.to_thread(fetch))
+    try:
+        while True:
+            # Shielded: cancelling the consumer must not cancel the task
+            # tracking the thread, or the finally below would stop waiting
+            # for a fetch that is still running.
+            batch = await asyncio.shield(pending)
+            if not batch:
+                break
+            pending = asyncio.ensure_future(asyncio.to_thread(fetch))
+            yield batch
+    finally:
+        # The thread cannot be interrupted; let it finish before the
+        # connection it is using is closed.
+        if not pending.done():
+            await asyncio.wait([pending])
+        if not pending.cancelled():
+            pending.exception()  # retrieved, so asyncio doesn't log it
+        await asyncio.to_thread(close)
+
+
+async def _opened(open_, close, *args):
+    """
+    Run open_(*args) in a thread and return what it opened. Cancelling
+    the caller can't stop the thread, so in that case wait for it and
+    close(result) instead of leaving the result to the garbage collector.
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(open_, *args))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        if not task.cancelled() and task.exception() is None:
+            await asyncio.to_thread(close, task.result())
+        raise
+
+
+def _open_stream_blocking(sql, dictionary):
+    connection = seed.connect_to_prodev()
+    if connection is None:
+        return None, None
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=dictionary, buffered=False)
+        cursor.execute(sql)
+    except BaseException:
+        seed.close_stream(cursor, connection)
+        raise
+    return connection, cursor
+
+
+def _close_opened_stream(stream):
+    connection, cursor = stream
+    if connection is not None:
+        seed.close_stream(cursor, connection)
+
+
+async def _open_stream(sql, dictionary=True):
+    # connect, cursor() (which pings) and execute all block: one thread
+    return await _opened(_open_stream_blocking, _close_opened_stream, sql, dictionary)
+
+
+async def stream_users_in_batches(batch_size):
+    """Async generator that yields lists of up to batch_size users."""
+    connection, cursor = await _open_stream("SELECT * FROM user_data;")
+    if connection is None:
+        return
+    batches = _prefetching(
+        lambda: cursor.fetchmany(batch_size),
+        lambda: seed.close_stream(cursor, connection),
+    )
+    async with aclosing(batches):
+        async for batch in batches:
+            yield batch
+
+
+async def stream_users(batch_size=1000):
+    """
+    Async generator that yields user rows one by one. Rows are fetched
+    from the server batch_size at a time.
+    """
+    async with aclosing(stream_users_in_batches(batch_size)) as batches:
+        async for batch in batches:
+            for row in batch:
+                yield row
+
+
+async def lazy_pagination(page_size, key=None, cursor=None):
+    """
+    Async generator that yields pages of users, with the same offset,
+    keyset and cursor options as 2-lazy_paginate.lazy_pagination.
+    """
+    reader = await _opened(lazy_paginate.PageReader, lazy_paginate.PageReader.close)
+    fetch_page = lazy_paginate.page_fetcher(reader, page_size, key, cursor)
+    async with aclosing(_prefetching(fetch_page, reader.close)) as pages:
+        async for page in pages:
+            yield page
@@ -0,0 +1,469 @@
+#!/usr/bin/python3
+"""
+benchmark.py
+Timing helpers for the generator functions in this project.
+
+    python benchmark.py pagination [page_size] [pages]
+    python benchmark.py memory [batch_size]
+    python benchmark.py pushdown [batch_size]
+    python benchmark.py csv
+    python benchmark.py harness [--backend sqlite|mysql] [--sizes N ...]
+                                [--modes NAME ...] [--output FILE]
+
+The harness seeds a user_data table with synthetic rows for each size,
+runs every generator mode against it and writes rows/sec,
+time-to-first-row, peak RSS and query/connection counts as JSON. The
+mysql backend uses a separate ALX_prodev_bench database; the sqlite
+backend needs no server.
+"""
+import argparse
+import asyncio
+import csv
+import importlib
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import mysql.connector
+
+import async_streams
+import csv_stream
+import parallel_scan
+import pool
+import pushdown
+import seed
+import sqlite_standin
+
+stream_users_mod = importlib.import_module("0-stream_users")
+batch_processing_mod = importlib.import_module("1-batch_processing")
+lazy_paginate = importlib.import_module("2-lazy_paginate")
+stream_ages_mod = importlib.import_module("4-stream_ages")
+
+BENCH_DATABASE = "ALX_prodev_bench"
+DEFAULT_SIZES = (1000, 100000)
+RSS_SAMPLE_ROWS = 10000
+
+
+def current_rss_kb():
+    """Resident set size of this process in KiB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        # ru_maxrss is the peak, not the current value, outside Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _unpooled_page(page_size, offset):
+    """One OFFSET page on a brand-new, unpooled connection."""
+    connection = pool.connect_unpooled("ALX_prodev")
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(lazy_paginate.OFFSET_PAGE_SQL, (page_size, offset))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return rows
+
+
+def bench_pagination(page_size=100, pages=50):
+    """
+    Compare per-page latency of opening a new, unpooled connection for
+    every page against lazy_pagination's reused connection.
+    """
+    start = time.perf_counter()
+    fetched = 0
+    while fetched < pages:
+        fetched += 1
+        if not _unpooled_page(page_size, (fetched - 1) * page_size):
+            break
+    fresh = (time.perf_counter() - start) / max(fetched, 1)
+
+    start = time.perf_counter()
+    count = 0
+    for _ in lazy_paginate.lazy_pagination(page_size):
+        count += 1
+        if count == pages:
+            break
+    reused = (time.perf_counter() - start) / max(count, 1)
+
+    print(f"Connection per page: {fresh * 1000:.2f} ms/page")
+    print(f"Reused connection:   {reused * 1000:.2f} ms/page")
+    return {"fresh_ms_per_page": fresh * 1000, "reused_ms_per_page": reused * 1000}
+
+
+def bench_stream_memory(batch_size=1000, sample_every=100000):
+    """
+    Stream the whole user_data table with stream_users and
+    stream_users_in_batches, sampling RSS as rows go by.
+    On a streaming cursor RSS stays flat regardless of table size.
+    """
+    results = {}
+    runs = (
+        ("stream_users", lambda: stream_users_mod.stream_users()),
+        ("stream_users_in_batches", lambda: (
+            row
+            for batch in batch_processing_mod.stream_users_in_batches(batch_size)
+            for row in batch
+        )),
+    )
+    for name, make_rows in runs:
+        start_rss = peak_rss = current_rss_kb()
+        rows = 0
+        start = time.perf_counter()
+        for _ in make_rows():
+            rows += 1
+            if rows % sample_every == 0:
+                peak_rss = max(peak_rss, current_rss_kb())
+        elapsed = time.perf_counter() - start
+        peak_rss = max(peak_rss, current_rss_kb())
+        results[name] = {
+            "rows": rows,
+            "seconds": elapsed,
+            "start_rss_kb": start_rss,
+            "peak_rss_kb": peak_rss,
+        }
+        print(
+            f"{name}: {rows} rows in {elapsed:.2f}s, "
+            f"RSS {start_rss} KiB -> peak {peak_rss} KiB"
+        )
+    return results
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_pushdown(batch_size=1000):
+    """
+    Compare the client-side generator paths with their SQL pushdown
+    equivalents: the age > 25 filter and the average age.
+    """
+    def client_filter():
+        return sum(
+            1
+            for batch in batch_processing_mod.stream_users_in_batches(batch_size)
+            for user in batch
+            if user["age"] > 25
+        )
+
+    def sql_filter():
+        return sum(
+            len(batch) for batch in pushdown.stream_users_older_than(25, batch_size)
+        )
+
+    results = {}
+    for name, func in (
+        ("filter_client", client_filter),
+        ("filter_pushdown", sql_filter),
+        ("average_client", stream_ages_mod.average_age_client_side),
+        ("average_pushdown", lambda: pushdown.age_stats()["avg"]),
+    ):
+        value, elapsed = _timed(func)
+        results[name] = {"result": float(value), "seconds": elapsed}
+        print(f"{name}: {float(value):.2f} in {elapsed:.3f}s")
+    return results
+
+
+def bench_csv(csv_file="user_data.csv"):
+    """
+    Compare csv.DictReader with the memory-mapped csv_stream readers:
+    rows/sec and peak Python allocation while parsing the whole file.
+    """
+    def dict_reader():
+        with open(csv_file, "r", encoding="utf-8") as f:
+            return sum(1 for _ in csv.DictReader(f))
+
+    results = {}
+    for name, func in (
+        ("DictReader", dict_reader),
+        ("csv_stream", lambda: sum(1 for _ in csv_stream.iter_rows(csv_file))),
+    ):
+        tracemalloc.start()
+        rows, elapsed = _timed(func)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rate = rows / elapsed if elapsed > 0 else 0
+        results[name] = {
+            "rows": rows, "seconds": elapsed,
+            "rows_per_sec": rate, "peak_alloc_kb": peak // 1024,
+        }
+        print(f"{name}: {rate:.0f} rows/sec, peak {peak // 1024} KiB allocated")
+    return results
+
+
+class CountingCursor:
+    """Cursor proxy counting statements sent to the server."""
+
+    def __init__(self, cursor, counters):
+        self._cursor = cursor
+        self._counters = counters
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        self._counters["queries"] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counters["queries"] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+
+class CountingConnection:
+    """Connection proxy whose cursors count statements."""
+
+    def __init__(self, connection, counters):
+        self._connection = connection
+        self._counters = counters
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self._counters)
+
+
+def counting_connector(connect, counters):
+    """
+    Wrap a connector so new connections and statements are counted.
+    Counts from parallel_scan worker processes are not included.
+    """
+    def connector(**settings):
+        counters["connects"] += 1
+        return CountingConnection(connect(**settings), counters)
+    return connector
+
+
+def mysql_bench_connector(**settings):
+    """Open connections to the benchmark database instead of ALX_prodev."""
+    if settings.get("database") == "ALX_prodev":
+        settings = dict(settings, database=BENCH_DATABASE)
+    return mysql.connector.connect(**settings)
+
+
+def _sync_iter(agen):
+    """Drive an async generator from synchronous code."""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+def _rows(rows):
+    for _ in rows:
+        yield 1
+
+
+def _batches(batches):
+    for batch in batches:
+        yield len(batch)
+
+
+def _columns(batches):
+    for batch in batches:
+        yield len(batch["user_id"])
+
+
+def _aggregate(func):
+    """Run an aggregate for the harness; it yields no rows."""
+    if func() is None:
+        raise RuntimeError("aggregate query failed")
+    yield from ()
+
+
+MODES = {
+    "stream_users": lambda: _rows(stream_users_mod.stream_users()),
+    "stream_users_async": lambda: _rows(_sync_iter(async_streams.stream_users())),
+    "stream_users_in_batches": lambda: _batches(
+        batch_processing_mod.stream_users_in_batches(1000)
+    ),
+    "stream_users_in_batches_adaptive": lambda: _batches(
+        batch_processing_mod.stream_users_in_batches(1000, target_seconds=0.05)
+    ),
+    "stream_users_in_batches_columnar": lambda: _columns(
+        batch_processing_mod.stream_users_in_batches(1000, columnar=True)
+    ),
+    "lazy_pagination_offset": lambda: _batches(lazy_paginate.lazy_pagination(1000)),
+    "lazy_pagination_keyset": lambda: _batches(
+        lazy_paginate.lazy_pagination(1000, key="user_id")
+    ),
+    "lazy_pagination_prefetch": lambda: _batches(
+        lazy_paginate.lazy_pagination(1000, key="user_id", prefetch=2)
+    ),
+    "calculate_average_age_client": lambda: _aggregate(
+        stream_ages_mod.average_age_client_side
+    ),
+    "calculate_average_age_pushdown": lambda: _aggregate(pushdown.age_stats),
+    "calculate_average_age_columnar": lambda: _aggregate(stream_ages_mod.age_summary),
+    "calculate_average_age_parallel": lambda: _aggregate(
+        parallel_scan.parallel_average_age
+    ),
+}
+
+
+def seed_synthetic(size, chunk_size=10000):
+    """Fill the (empty) user_data table with `size` synthetic users."""
+    rng = random.Random(size)
+    connection = pool.connect("ALX_prodev")
+    cursor = connection.cursor()
+    for start in range(0, size, chunk_size):
+        rows = [
+            (
+                str(uuid.uuid4()), f"User {i}", f"user{i}@example.com",
+                rng.randint(1, 120),
+            )
+            for i in range(start, min(start + chunk_size, size))
+        ]
+        cursor.executemany(seed.INSERT_USER_SQL, rows)
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+
+def measure(make_counts, table_rows):
+    """
+    Consume one mode and return its metrics. Aggregate modes report the
+    table size as rows processed and no time-to-first-row.
+    """
+    base_rss = peak_rss = current_rss_kb()
+    rows, next_sample, first_row = 0, RSS_SAMPLE_ROWS, None
+    start = time.perf_counter()
+    for count in make_counts():
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        rows += count
+        if rows >= next_sample:
+            peak_rss = max(peak_rss, current_rss_kb())
+            next_sample = rows + RSS_SAMPLE_ROWS
+    elapsed = time.perf_counter() - start
+    peak_rss = max(peak_rss, current_rss_kb())
+    if rows == 0:
+        rows = table_rows
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else None,
+        "time_to_first_row": first_row,
+        "peak_rss_kb": peak_rss,
+        "rss_growth_kb": peak_rss - base_rss,
+    }
+
+
+def run_harness(backend="sqlite", sizes=DEFAULT_SIZES, modes=None, output=None):
+    """
+    Seed each size of synthetic data, run every mode against it and
+    return (and optionally write) the results as a JSON-able dict.
+    """
+    modes = modes or list(MODES)
+    workdir = tempfile.mkdtemp(prefix="user_data_bench_")
+    sqlite_path = os.path.join(workdir, "user_data.db")
+    if backend == "sqlite":
+        connect = sqlite_standin.connector(sqlite_path)
+    else:
+        connect = mysql_bench_connector
+
+    report = {
+        "backend": backend,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "results": {},
+    }
+    try:
+        for size in sizes:
+            pool.set_connector(connect)
+            if backend == "sqlite":
+                sqlite_standin.create_user_data(sqlite_path)
+            else:
+                connection = seed.connect_db()
+                cursor = connection.cursor()
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_DATABASE}")
+                cursor.close()
+                connection.close()
+                connection = pool.connect("ALX_prodev")
+                seed.create_table(connection)
+                cursor = connection.cursor()
+                cursor.execute("TRUNCATE TABLE user_data")
+                cursor.close()
+                connection.close()
+            seed_synthetic(size)
+
+            results = report["results"][str(size)] = {}
+            for name in modes:
+                counters = {"queries": 0, "connects": 0}
+                # Fresh pools per mode so connection counts are comparable
+                pool.set_connector(counting_connector(connect, counters))
+                try:
+                    metrics = measure(MODES[name], size)
+                except Exception as e:
+                    metrics = {"error": f"{type(e).__name__}: {e}"}
+                metrics.update(counters)
+                results[name] = metrics
+                print(f"[{size}] {name}: {metrics}")
+    finally:
+        pool.set_connector(None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    commands = parser.add_subparsers(dest="command")
+    pagination = commands.add_parser("pagination")
+    pagination.add_argument("page_size", type=int, nargs="?", default=100)
+    pagination.add_argument("pages", type=int, nargs="?", default=50)
+    memory = commands.add_parser("memory")
+    memory.add_argument("batch_size", type=int, nargs="?", default=1000)
+    pushdown_cmd = commands.add_parser("pushdown")
+    pushdown_cmd.add_argument("batch_size", type=int, nargs="?", default=1000)
+    commands.add_parser("csv")
+    harness = commands.add_parser("harness")
+    harness.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    harness.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    harness.add_argument("--modes", nargs="+", choices=list(MODES))
+    harness.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "memory":
+        bench_stream_memory(args.batch_size)
+    elif args.command == "pushdown":
+        bench_pushdown(args.batch_size)
+    elif args.command == "csv":
+        bench_csv()
+    elif args.command == "harness":
+        run_harness(args.backend, args.sizes, args.modes, args.output)
+    else:
+        bench_pagination(
+            getattr(args, "page_size", 100), getattr(args, "pages", 50)
+        )
+
+
+if __name__ == "__main__":
+    main()
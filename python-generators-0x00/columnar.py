@@ -0,0 +1,86 @@
+"""
+columnar.py
+Column-oriented batches of user_data rows and vectorized age
+aggregation over them. Requires numpy.
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the columnar mode
+    np = None
+
+
+def require_numpy():
+    """Raise a clear error when the columnar mode is used without numpy."""
+    if np is None:
+        raise ImportError("columnar batches require numpy: pip install numpy")
+
+
+def to_columns(column_names, rows):
+    """
+    Transpose a batch of row tuples into {column: array}.
+    age becomes a float64 array, text columns compact unicode arrays.
+    """
+    require_numpy()
+    if not rows:
+        return {name: np.array([]) for name in column_names}
+    columns = {}
+    for name, values in zip(column_names, zip(*rows)):
+        if name == "age":
+            columns[name] = np.fromiter(values, dtype=np.float64, count=len(rows))
+        else:
+            columns[name] = np.array(values, dtype=str)
+    return columns
+
+
+class AgeAccumulator:
+    """
+    Running age statistics updated one array of ages at a time.
+    Ages are kept as a value -> count table, so mean, exact percentiles
+    and histograms need no per-row Python loop and accumulators from
+    different batches or workers can be merged.
+    """
+
+    def __init__(self):
+        require_numpy()
+        self.count = 0
+        self.total = 0.0
+        self.value_counts = {}
+
+    def update(self, ages):
+        """Fold one array of ages into the running statistics."""
+        if len(ages) == 0:
+            return
+        self.count += len(ages)
+        self.total += float(ages.sum())
+        values, counts = np.unique(ages, return_counts=True)
+        for value, n in zip(values.tolist(), counts.tolist()):
+            self.value_counts[value] = self.value_counts.get(value, 0) + n
+
+    def merge(self, other):
+        """Combine another accumulator into this one."""
+        self.count += other.count
+        self.total += other.total
+        for value, n in other.value_counts.items():
+            self.value_counts[value] = self.value_counts.get(value, 0) + n
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentiles(self, qs=(50, 90, 99)):
+        """Nearest-rank percentiles, e.g. {50: 49.0, 90: ...}."""
+        if not self.count:
+            return {q: None for q in qs}
+        values = np.array(sorted(self.value_counts))
+        cumulative = np.cumsum([self.value_counts[v] for v in values])
+        ranks = np.ceil(np.array(qs, dtype=np.float64) / 100 * self.count)
+        idx = np.searchsorted(cumulative, np.maximum(ranks, 1))
+        return {q: float(values[i]) for q, i in zip(qs, idx)}
+
+    def histogram(self, bucket_size=10):
+        """Return {bucket_start: count} over buckets of bucket_size."""
+        buckets = {}
+        for value, n in self.value_counts.items():
+            start = int(value // bucket_size * bucket_size)
+            buckets[start] = buckets.get(start, 0) + n
+        return dict(sorted(buckets.items()))
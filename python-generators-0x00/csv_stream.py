@@ -0,0 +1,71 @@
+"""
+csv_stream.py
+Streaming CSV reader for seed files: the file is memory-mapped and
+parsed line by line into tuples.
+Quoted fields must not contain newlines (true for user_data.csv).
+"""
+import csv
+import mmap
+import os
+
+import columnar
+
+
+def _iter_lines(mm, start, end):
+    """Yield decoded lines of mm[start:end] without reading the whole file."""
+    pos = start
+    while pos < end:
+        nl = mm.find(b"\n", pos, end)
+        stop = end if nl == -1 else nl + 1
+        yield mm[pos:stop].decode("utf-8")
+        pos = stop
+
+
+def read_header(path):
+    """Return the CSV header as a tuple of column names."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return tuple(next(csv.reader(f)))
+
+
+def iter_rows(path, start=0, end=None):
+    """
+    Generator that yields each data row of the CSV as a tuple.
+    start/end are byte offsets on line boundaries; the header line is
+    skipped when reading from the start of the file.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm) if end is None else end
+        if start == 0:
+            nl = mm.find(b"\n")
+            start = end if nl == -1 else min(nl + 1, end)
+        for row in csv.reader(_iter_lines(mm, start, end)):
+            if row:
+                yield tuple(row)
+
+
+def iter_record_batches(path, batch_size=10000):
+    """
+    Generator that yields numpy record arrays of up to batch_size rows,
+    with the CSV header as field names and age as an integer column.
+    """
+    columnar.require_numpy()
+    np = columnar.np
+    names = read_header(path)
+    batch = []
+    for row in iter_rows(path):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield _to_records(np, names, batch)
+            batch = []
+    if batch:
+        yield _to_records(np, names, batch)
+
+
+def _to_records(np, names, rows):
+    arrays = [
+        np.array(values, dtype=np.int64 if name == "age" else str)
+        for name, values in zip(names, zip(*rows))
+    ]
+    return np.rec.fromarrays(arrays, names=list(names))
@@ -0,0 +1,146 @@
+"""
+parallel_scan.py
+Scan user_data in parallel by splitting it into user_id key ranges,
+each read by a process-pool worker over its own connection.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import seed
+
+# user_id values are lowercase UUID strings, so ranges are split over
+# their first 8 hex digits
+PREFIX_SPACE = 16 ** 8
+
+
+def key_ranges(partitions):
+    """
+    Split the user_id space into `partitions` contiguous (low, high)
+    ranges. low is inclusive, high exclusive, None means unbounded.
+    """
+    bounds = [f"{i * PREFIX_SPACE // partitions:08x}" for i in range(1, partitions)]
+    lows = [None] + bounds
+    highs = bounds + [None]
+    return list(zip(lows, highs))
+
+
+def _range_query(columns, key_range):
+    low, high = key_range
+    where, params = [], []
+    if low is not None:
+        where.append("user_id >= %s")
+        params.append(low)
+    if high is not None:
+        where.append("user_id < %s")
+        params.append(high)
+    sql = f"SELECT {columns} FROM user_data"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY user_id", params
+
+
+def _connect():
+    """Worker connection; raises instead of returning None on failure."""
+    connection = seed.connect_to_prodev()
+    if connection is None:
+        raise ConnectionError("Could not connect to ALX_prodev")
+    return connection
+
+
+def scan_range(key_range):
+    """Worker: return all rows whose user_id falls in key_range."""
+    connection = _connect()
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(*_range_query("*", key_range))
+        return cursor.fetchall()
+    finally:
+        seed.close_stream(cursor, connection)
+
+
+def stream_range(key_range, columns="*"):
+    """
+    Generator that yields rows (as dicts) whose user_id falls in
+    key_range, streamed from an unbuffered cursor.
+    """
+    connection = _connect()
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute(*_range_query(columns, key_range))
+        for row in cursor:
+            yield row
+    finally:
+        seed.close_stream(cursor, connection)
+
+
+def age_partial_range(key_range):
+    """Worker: return (sum, count) of ages for one key range."""
+    total, count = 0, 0
+    for row in stream_range(key_range, "age"):
+        total += row["age"]
+        count += 1
+    return total, count
+
+
+def map_ranges(worker, workers=4, partitions=None, ordered=True):
+    """
+    Run worker(key_range) for every key range on a process pool and
+    yield the results. Ordered results follow user_id order; unordered
+    results are yielded as soon as each range completes.
+    At most workers + 1 ranges are in flight: the next range is only
+    submitted as a result is taken, so a slow consumer never has more
+    than a few ranges' results waiting in this process.
+    """
+    partitions = partitions or workers * 16
+    ranges = iter(key_ranges(partitions))
+    limit = workers + 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+
+        def refill():
+            while len(in_flight) < limit:
+                key_range = next(ranges, None)
+                if key_range is None:
+                    return
+                in_flight.append(pool.submit(worker, key_range))
+
+        try:
+            refill()
+            while in_flight:
+                if ordered:
+                    future = in_flight.popleft()
+                else:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    in_flight.remove(future)
+                result = future.result()
+                refill()  # keep the workers busy while the result is consumed
+                yield result
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def parallel_stream_users(workers=4, partitions=None, ordered=True):
+    """
+    Generator that yields every user_data row, read in parallel.
+    More partitions than workers keeps each in-flight range small.
+    """
+    for rows in map_ranges(scan_range, workers, partitions, ordered):
+        yield from rows
+
+
+def parallel_average_age(workers=4, partitions=None):
+    """
+    Average age computed from per-range (sum, count) partials, so the
+    result matches calculate_average_age exactly.
+    """
+    total, count = 0, 0
+    for part_total, part_count in map_ranges(
+        age_partial_range, workers, partitions, ordered=False
+    ):
+        total += part_total
+        count += part_count
+    return total / count if count > 0 else 0
@@ -0,0 +1,342 @@
+"""
+pool.py
+Shared MySQL connection pool for seed.py and the generator modules.
+Connection settings come from the environment (DB_USER, DB_PASSWORD,
+DB_HOST) in one place; pools are created per database and connection
+options and reused for the life of the process.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+from dotenv import load_dotenv
+import mysql.connector
+from mysql.connector import Error, errors
+
+# Load environment variables
+load_dotenv()
+
+
+class PooledConnection:
+    """
+    Proxy for a pooled mysql.connector connection. Everything is
+    delegated to the real connection except close(), which returns it
+    to the pool. A proxy garbage collected without close() hands its
+    connection back too, so a forgotten close() can't hold a slot forever.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._checked_out = time.perf_counter()
+        self._pid = os.getpid()
+        self._finalizer = weakref.finalize(self, pool.reclaim, connection, self._pid)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            self._finalizer.detach()
+            connection, self._connection = self._connection, None
+            if self._pid != os.getpid():
+                # Checked out before a fork; see ConnectionPool._reset
+                _inherited.append(connection)
+                return
+            self._pool.release(connection, time.perf_counter() - self._checked_out)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of mysql.connector connections.
+    Keeps at least min_size idle connections once warmed, never more
+    than max_size open at a time, drops connections idle longer than
+    idle_timeout and pings connections idle longer than ping_after
+    before handing them out.
+    """
+
+    def __init__(self, min_size=1, max_size=5, idle_timeout=300,
+                 checkout_timeout=10, ping_after=1.0, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self.connect_kwargs = connect_kwargs
+        self._lock = threading.Condition()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        if self._pid is not None:
+            # Forked child: the connections share sockets with the parent.
+            # Closing them, or letting mysql.connector's __del__ run, would
+            # shut those sockets down under the parent, so keep them.
+            _inherited.extend(connection for connection, _ in self._idle)
+            _inherited.extend(self._lost)
+        self._pid = os.getpid()
+        self._idle = []  # (connection, released_at), most recent last
+        self._lost = deque()  # from proxies collected without close()
+        self._open = 0
+        self.metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "reclaimed": 0,
+            "health_check_failures": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "hold_seconds_total": 0.0,
+            "hold_seconds_max": 0.0,
+        }
+
+    def acquire(self):
+        """
+        Check out a connection, waiting up to checkout_timeout for one
+        to be released when the pool is at max_size.
+        """
+        start = time.perf_counter()
+        deadline = start + self.checkout_timeout
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: sockets belong to the parent process
+                self._reset()
+            while True:
+                self._drain_lost()
+                connection = self._take_idle()
+                if connection is not None:
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise errors.PoolError("Timed out waiting for a pooled connection")
+                self._lock.wait(remaining)
+
+        if connection is None:
+            try:
+                connection = _connector(**self.connect_kwargs)
+            except Error:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self.metrics["created"] += 1
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.metrics["checkouts"] += 1
+            self.metrics["wait_seconds_total"] += waited
+            self.metrics["wait_seconds_max"] = max(
+                self.metrics["wait_seconds_max"], waited
+            )
+        return PooledConnection(self, connection)
+
+    def _take_idle(self):
+        """Pop a healthy idle connection, discarding stale ones (lock held)."""
+        now = time.monotonic()
+        while self._idle:
+            connection, released_at = self._idle.pop()
+            idle_for = now - released_at
+            if idle_for > self.idle_timeout:
+                self._discard(connection)
+                continue
+            if idle_for > self.ping_after and not self._healthy(connection):
+                self.metrics["health_check_failures"] += 1
+                self._discard(connection)
+                continue
+            return connection
+        return None
+
+    @staticmethod
+    def _healthy(connection):
+        try:
+            return connection.is_connected()
+        except Error:
+            return False
+
+    def _discard(self, connection):
+        """Close a connection for good (lock held)."""
+        self._open -= 1
+        self.metrics["discarded"] += 1
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def release(self, connection, held_seconds=0.0):
+        """
+        Return a connection to the pool. Connections with unread results
+        are closed instead of reused; open transactions are rolled back.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                _inherited.append(connection)
+                return
+            self.metrics["hold_seconds_total"] += held_seconds
+            self.metrics["hold_seconds_max"] = max(
+                self.metrics["hold_seconds_max"], held_seconds
+            )
+            self._return(connection)
+            self._drain_lost()
+
+    def _return(self, connection):
+        """Put a released connection back in the idle list or close it (lock held)."""
+        reusable = False
+        try:
+            if not connection.unread_result:
+                if connection.in_transaction:
+                    connection.rollback()
+                reusable = True
+        except Error:
+            pass
+        if reusable:
+            self._idle.append((connection, time.monotonic()))
+            self._trim_idle()
+        else:
+            self._discard(connection)
+        self._lock.notify()
+
+    def reclaim(self, connection, pid):
+        """
+        Finalizer of a PooledConnection dropped without close(). The
+        connection is queued and released as soon as the lock is free;
+        the finalizer may run inside a pool method, so it never blocks.
+        pid is the process that checked it out.
+        """
+        if pid != os.getpid():
+            _inherited.append(connection)
+            return
+        self._lost.append(connection)
+        if self._lock.acquire(blocking=False):
+            try:
+                self._drain_lost()
+            finally:
+                self._lock.release()
+
+    def _drain_lost(self):
+        """Release connections queued by reclaim() (lock held)."""
+        if self._pid != os.getpid():
+            self._reset()
+            return
+        while self._lost:
+            self.metrics["reclaimed"] += 1
+            self._return(self._lost.popleft())
+
+    def _trim_idle(self):
+        """Close idle connections past idle_timeout beyond min_size (lock held)."""
+        now = time.monotonic()
+        keep = []
+        for index, (connection, released_at) in enumerate(self._idle):
+            expired = now - released_at > self.idle_timeout
+            surplus = len(self._idle) - index > self.min_size
+            if expired and surplus:
+                self._discard(connection)
+            else:
+                keep.append((connection, released_at))
+        self._idle = keep
+
+    def warm(self):
+        """Open connections until min_size are idle."""
+        connections = [self.acquire() for _ in range(self.min_size - len(self._idle))]
+        for connection in connections:
+            connection.close()
+
+    def stats(self):
+        """Snapshot of pool size and checkout timing metrics."""
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+        checkouts = stats["checkouts"] or 1
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / checkouts
+        stats["hold_seconds_avg"] = stats["hold_seconds_total"] / checkouts
+        return stats
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+                return
+            for connection, _ in self._idle:
+                self._discard(connection)
+            self._idle = []
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Connections a forked child inherited from its parent's pools; held
+# for the life of the process and never closed (see ConnectionPool._reset)
+_inherited = []
+_connector = mysql.connector.connect
+
+
+def set_connector(connector):
+    """
+    Replace the function pools use to open connections (called with
+    mysql.connector.connect keyword arguments) and drop existing pools.
+    Used by benchmark.py to count queries or run against a stand-in.
+    Pass None to restore mysql.connector.connect.
+    """
+    global _connector
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+        _connector = connector or mysql.connector.connect
+
+
+def connection_settings(database=None, **options):
+    """mysql.connector.connect keyword arguments from the environment."""
+    settings = {
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "host": os.getenv("DB_HOST"),
+    }
+    if database:
+        settings["database"] = database
+    settings.update(options)
+    return settings
+
+
+def connect_unpooled(database=None, **options):
+    """
+    Open a new connection outside any pool; close() really closes it.
+    Goes through the connector set with set_connector.
+    """
+    return _connector(**connection_settings(database, **options))
+
+
+def get_pool(database=None, **options):
+    """
+    Return the shared pool for database and connection options.
+    Pool sizes default to DB_POOL_MIN / DB_POOL_MAX from the environment.
+    """
+    key = (database, tuple(sorted(options.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                min_size=int(os.getenv("DB_POOL_MIN", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX", "5")),
+                **connection_settings(database, **options)
+            )
+            _pools[key] = pool
+        return pool
+
+
+def connect(database=None, **options):
+    """Check out a pooled connection; close() returns it to the pool."""
+    return get_pool(database, **options).acquire()
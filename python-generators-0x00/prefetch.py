@@ -0,0 +1,72 @@
+"""
+prefetch.py
+Run any generator in a background thread, keeping up to `depth` items
+ready in a bounded queue so the producer's I/O overlaps with the
+consumer's processing.
+"""
+import queue
+import threading
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception raised by the producer to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(iterable, depth=2):
+    """
+    Generator that yields the items of iterable, produced ahead of time
+    in a background thread. At most `depth` items wait in the queue.
+    Closing the generator early stops the producer and closes the
+    source iterator in the producer thread. depth must be at least 1.
+    """
+    if depth < 1:
+        # Queue(maxsize=0) would be unbounded
+        raise ValueError(f"prefetch depth must be at least 1, got {depth}")
+    return _prefetch(iterable, depth)
+
+
+def _prefetch(iterable, depth):
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    source = iter(iterable)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in source:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
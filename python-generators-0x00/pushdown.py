@@ -0,0 +1,81 @@
+"""
+pushdown.py
+Filters and aggregates over user_data evaluated by MySQL instead of
+streaming every row into Python.
+"""
+from mysql.connector import Error
+
+import seed
+
+
+def stream_users_older_than(min_age, batch_size):
+    """
+    Generator that yields batches of users with age > min_age.
+    The predicate runs in the WHERE clause, so only matching rows
+    leave the server.
+    """
+    connection = seed.connect_to_prodev()
+    if connection is None:
+        return
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute("SELECT * FROM user_data WHERE age > %s", (min_age,))
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+    except Error as e:
+        print(f"Error: {e}")
+    finally:
+        seed.close_stream(cursor, connection)
+
+
+def _fetch_all(sql, params=()):
+    """Run an aggregate query and return its rows, or None on error."""
+    connection = seed.connect_to_prodev()
+    if connection is None:
+        return None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except Error as e:
+        print(f"Error: {e}")
+        return None
+    finally:
+        connection.close()
+
+
+def age_stats():
+    """
+    Return {"count", "avg", "min", "max"} of user ages computed in MySQL,
+    or None if the query could not be run.
+    """
+    rows = _fetch_all(
+        "SELECT COUNT(*) AS count, AVG(age) AS avg, "
+        "MIN(age) AS min, MAX(age) AS max FROM user_data"
+    )
+    if rows is None:
+        return None
+    stats = rows[0]
+    stats["avg"] = float(stats["avg"]) if stats["avg"] is not None else 0
+    return stats
+
+
+def age_histogram(bucket_size=10):
+    """
+    Return {bucket_start: count} of user ages grouped into buckets of
+    bucket_size years, or None if the query could not be run.
+    """
+    rows = _fetch_all(
+        "SELECT FLOOR(age / %s) * %s AS bucket, COUNT(*) AS count "
+        "FROM user_data GROUP BY bucket ORDER BY bucket",
+        (bucket_size, bucket_size)
+    )
+    if rows is None:
+        return None
+    return {int(row["bucket"]): row["count"] for row in rows}
@@ -4,28 +4,33 @@ Setup MySQL database ALX_prodev with table user_data,
 and populate from user_data.csv
 """
 import os
-from dotenv import load_dotenv
-import mysql.connector
 from mysql.connector import Error
 import csv
+import sys
+import time
 import uuid
 
-# Load environment variables
-load_dotenv()
+import csv_stream
+import pool
+import seed_manifest
+
+INSERT_USER_SQL = (
+    "INSERT INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+)
+
+# Server/client error codes raised when LOAD DATA LOCAL INFILE is refused
+# (ER_NOT_ALLOWED_COMMAND, ER_CLIENT_LOCAL_FILES_DISABLED,
+#  CR_LOAD_DATA_LOCAL_INFILE_REJECTED)
+LOCAL_INFILE_DISABLED_ERRORS = (1148, 3948, 2068)
 
 def connect_db():
     """Connects to MySQL server (without specifying database)."""
     try:
-        connection = mysql.connector.connect(
-            user = os.getenv("DB_USER"),
-            password = os.getenv("DB_PASSWORD"),
-            host = os.getenv("DB_HOST")
-        )
-        if connection.is_connected():
-            return connection
+        return pool.connect()
     except Error as e:
         print(f"Error while connecting to MySQL: {e}")
-    return None 
+    return None
+
 
 def create_database(connection):
     """Creates database ALX_prodev if not exists."""
@@ -37,21 +42,35 @@ def create_database(connection):
     except Error as e:
         print(f"Error creating database: {e}")
         
-def connect_to_prodev():
-    """Connects directly to ALX_prodev database."""
+def connect_to_prodev(allow_local_infile=False):
+    """
+    Connects directly to ALX_prodev database.
+    allow_local_infile enables LOAD DATA LOCAL INFILE on the client side.
+    Connections come from the shared pool; close() returns them.
+    """
+    options = {"allow_local_infile": True} if allow_local_infile else {}
     try:
-        connection = mysql.connector.connect(
-            database="ALX_prodev",
-            user = os.getenv("DB_USER"),
-            password = os.getenv("DB_PASSWORD"),
-            host = os.getenv("DB_HOST")
-        )                  
-        if connection.is_connected():
-            print(f"Connection successful: {connection.database}")
-            return connection
+        connection = pool.connect("ALX_prodev", **options)
+        print(f"Connection successful: {connection.database}")
+        return connection
     except Error as e:
         print(f"Error connecting to ALX_prodev: {e}")
-    return None 
+    return None
+
+
+def close_stream(cursor, connection):
+    """
+    Close an unbuffered cursor and its connection.
+    A generator closed early leaves unread rows on the wire; the pool
+    then closes the connection instead of reusing it, which discards
+    them without reading the rest of the result.
+    """
+    try:
+        if cursor is not None:
+            cursor.close()
+    except Error:
+        pass
+    connection.close()
 
 
 def create_table(connection):
@@ -64,7 +83,8 @@ def create_table(connection):
                     name VARCHAR(255) NOT NULL,
                     email VARCHAR(255) NOT NULL,
                     age DECIMAL NOT NULL,
-                    INDEX (user_id)
+                    INDEX (user_id),
+                    INDEX (email)
                 );                           
         """)     
         connection.commit()
@@ -90,10 +110,7 @@ def insert_data(connection, csv_file):
                 cursor.execute("SELECT user_id FROM user_data WHERE email = %s", (email,))
                 result = cursor.fetchone()
                 if not result:
-                    cursor.execute(
-                        "INSERT INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)",
-                        (user_id, name, email, age)
-                    ) 
+                    cursor.execute(INSERT_USER_SQL, (user_id, name, email, age))
         connection.commit()
         cursor.close()
         print("Data inserted successful.")
@@ -101,10 +118,257 @@ def insert_data(connection, csv_file):
         print(f"Error inserting data: {e}")
     except FileNotFoundError:
         print(f"CSV file {csv_file} not found.")
-                              
+
+
+def fetch_existing_emails(connection):
+    """Returns the set of emails already present in user_data."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT email FROM user_data")
+    emails = {email for (email,) in cursor}
+    cursor.close()
+    return emails
+
+
+def bulk_insert_data(connection, csv_file, chunk_size=1000):
+    """
+    Bulk load user_data from CSV.
+    Emails already in the table are fetched once up front, the CSV is
+    streamed in chunks of chunk_size rows and each chunk is written
+    with a single executemany call.
+    """
+    start = time.perf_counter()
+    inserted = 0
+    try:
+        header = csv_stream.read_header(csv_file)
+        name_idx, email_idx, age_idx = (
+            header.index("name"), header.index("email"), header.index("age")
+        )
+        rows = csv_stream.iter_rows(csv_file)
+
+        seen = fetch_existing_emails(connection)
+        cursor = connection.cursor()
+        chunk = []
+        for row in rows:
+            email = row[email_idx]
+            if email in seen:
+                continue
+            seen.add(email)
+            chunk.append((str(uuid.uuid4()), row[name_idx], email, int(row[age_idx])))
+            if len(chunk) == chunk_size:
+                cursor.executemany(INSERT_USER_SQL, chunk)
+                inserted += len(chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(INSERT_USER_SQL, chunk)
+            inserted += len(chunk)
+        connection.commit()
+        cursor.close()
+        elapsed = time.perf_counter() - start
+        rate = inserted / elapsed if elapsed > 0 else 0
+        print(f"Bulk inserted {inserted} rows in {elapsed:.2f}s ({rate:.0f} rows/sec).")
+    except Error as e:
+        print(f"Error bulk inserting data: {e}")
+    except FileNotFoundError:
+        print(f"CSV file {csv_file} not found.")
+    return inserted
+
+
+def _load_data_columns(header):
+    """
+    LOAD DATA column list for a CSV header: name, email and age load
+    into their staging columns (the first of each, like header.index in
+    bulk_insert_data), anything else into a throwaway user variable.
+    """
+    wanted = {"name", "email", "age"}
+    missing = wanted.difference(header)
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+    columns = []
+    for index, column in enumerate(header):
+        if column in wanted:
+            wanted.discard(column)
+            columns.append(column)
+        else:
+            columns.append(f"@unused{index}")
+    return ", ".join(columns)
+
+
+def load_data_infile(connection, csv_file, chunk_size=1000):
+    """
+    Fast path for large refreshes using LOAD DATA LOCAL INFILE.
+    The CSV is loaded into a temporary staging table (user_id generated
+    server side, duplicate emails dropped by the staging primary key)
+    and merged into user_data with one INSERT ... SELECT. Columns are
+    matched by the CSV header, as in bulk_insert_data.
+    Falls back to bulk_insert_data when local_infile is disabled.
+    The connection must be opened with allow_local_infile=True.
+    """
+    if not os.path.isfile(csv_file):
+        print(f"CSV file {csv_file} not found.")
+        return 0
+
+    start = time.perf_counter()
+    columns = _load_data_columns(csv_stream.read_header(csv_file))
+    fall_back = False
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS user_data_stage")
+        cursor.execute("""
+                CREATE TEMPORARY TABLE user_data_stage(
+                    user_id CHAR(36) NOT NULL,
+                    name VARCHAR(255) NOT NULL,
+                    email VARCHAR(255) NOT NULL PRIMARY KEY,
+                    age DECIMAL NOT NULL
+                );
+        """)
+        cursor.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE user_data_stage
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            IGNORE 1 LINES
+            ({columns})
+            SET user_id = UUID()
+            """,
+            (os.path.abspath(csv_file),)
+        )
+        cursor.execute("""
+                INSERT INTO user_data (user_id, name, email, age)
+                SELECT s.user_id, s.name, s.email, s.age
+                FROM user_data_stage s
+                LEFT JOIN user_data u ON u.email = s.email
+                WHERE u.user_id IS NULL
+        """)
+        inserted = cursor.rowcount
+        connection.commit()
+    except Error as e:
+        connection.rollback()
+        if e.errno not in LOCAL_INFILE_DISABLED_ERRORS:
+            print(f"Error loading data: {e}")
+            return 0
+        print(f"LOAD DATA LOCAL INFILE unavailable ({e}), using batched inserts.")
+        fall_back = True
+    finally:
+        # The staging table lives as long as the (pooled) connection
+        try:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS user_data_stage")
+        except Error:
+            pass
+        cursor.close()
+    if fall_back:
+        return bulk_insert_data(connection, csv_file, chunk_size)
+
+    elapsed = time.perf_counter() - start
+    rate = inserted / elapsed if elapsed > 0 else 0
+    print(f"Loaded {inserted} rows in {elapsed:.2f}s ({rate:.0f} rows/sec).")
+    return inserted
+
+
+def fetch_existing_rows(connection):
+    """Returns {email: (name, age)} for the rows already in user_data."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT email, name, age FROM user_data")
+    rows = {email: (name, age) for email, name, age in cursor}
+    cursor.close()
+    return rows
+
+
+def _apply_updates(cursor, updates, chunk_size):
+    """
+    Update name and age by email for [(email, name, age), ...]. The
+    changes go into a temporary table (batched multi-row INSERTs) and
+    are applied with one UPDATE ... JOIN, instead of one round trip and
+    one lookup by email per row.
+    """
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS user_data_changes")
+    cursor.execute("""
+            CREATE TEMPORARY TABLE user_data_changes(
+                email VARCHAR(255) NOT NULL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                age DECIMAL NOT NULL
+            );
+    """)
+    for chunk in _chunks(updates, chunk_size):
+        cursor.executemany(
+            "INSERT INTO user_data_changes (email, name, age) VALUES (%s, %s, %s)",
+            chunk,
+        )
+    cursor.execute("""
+            UPDATE user_data u
+            JOIN user_data_changes c ON c.email = u.email
+            SET u.name = c.name, u.age = c.age
+    """)
+    cursor.execute("DROP TEMPORARY TABLE user_data_changes")
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def incremental_insert_data(connection, csv_file, manifest_file=None, chunk_size=1000):
+    """
+    Apply only what changed in the CSV since the last run.
+    A manifest (see seed_manifest) records the file checksum and a hash
+    per email; rows are diffed against it into new, changed and deleted
+    sets which are written with batched INSERT, UPDATE and DELETE.
+    Without a manifest, rows whose email is already in user_data are
+    compared with the stored name and age and updated only if they differ.
+    """
+    manifest_file = manifest_file or seed_manifest.manifest_path(csv_file)
+    start = time.perf_counter()
+    try:
+        manifest = seed_manifest.load_manifest(manifest_file)
+        result = seed_manifest.diff(csv_file, manifest)
+        if result is None:
+            print("CSV unchanged since last load, nothing to do.")
+            return 0, 0, 0
+        new, changed, deleted, hashes, checksum, size = result
+
+        if manifest is None:
+            existing = fetch_existing_rows(connection)
+            for email in existing.keys() & new.keys():
+                row = new.pop(email)
+                if existing[email] != row:
+                    changed[email] = row
+
+        cursor = connection.cursor()
+        inserts = [(str(uuid.uuid4()), name, email, age)
+                   for email, (name, age) in new.items()]
+        for chunk in _chunks(inserts, chunk_size):
+            cursor.executemany(INSERT_USER_SQL, chunk)
+        if changed:
+            updates = [(email, name, age) for email, (name, age) in changed.items()]
+            _apply_updates(cursor, updates, chunk_size)
+        for chunk in _chunks(deleted, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"DELETE FROM user_data WHERE email IN ({placeholders})", chunk
+            )
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        print(f"Error applying incremental load: {e}")
+        return None
+    except FileNotFoundError:
+        print(f"CSV file {csv_file} not found.")
+        return None
+
+    seed_manifest.save_manifest(
+        manifest_file, {"size": size, "sha256": checksum, "rows": hashes}
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Incremental load: {len(new)} new, {len(changed)} changed, "
+        f"{len(deleted)} deleted in {elapsed:.2f}s."
+    )
+    return len(new), len(changed), len(deleted)
 
 
 if __name__ == "__main__":
+    # Optional load mode: python seed.py [row|bulk|infile|incremental]
+    mode = sys.argv[1] if len(sys.argv) > 1 else "row"
+
     # Connect to MySQL server
     connection = connect_db()
     if connection:
@@ -112,9 +376,16 @@ if __name__ == "__main__":
         connection.close()
 
     # Connect to the ALX_prodev database
-    prodev_conn = connect_to_prodev()
+    prodev_conn = connect_to_prodev(allow_local_infile=(mode == "infile"))
     if prodev_conn:
         create_table(prodev_conn)
-        insert_data(prodev_conn, "user_data.csv")
+        if mode == "infile":
+            load_data_infile(prodev_conn, "user_data.csv")
+        elif mode == "incremental":
+            incremental_insert_data(prodev_conn, "user_data.csv")
+        elif mode == "bulk":
+            bulk_insert_data(prodev_conn, "user_data.csv")
+        else:
+            insert_data(prodev_conn, "user_data.csv")
         prodev_conn.close()
            
\ No newline at end of file
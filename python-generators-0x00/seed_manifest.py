@@ -0,0 +1,137 @@
+"""
+seed_manifest.py
+Change detection for incremental seeding: a JSON manifest records the
+checksum and size of the CSV that was last loaded plus a hash per
+email, and the next run diffs the CSV against it.
+"""
+import hashlib
+import json
+import os
+
+import csv_stream
+
+HASH_CHUNK = 1 << 20
+
+
+def manifest_path(csv_file):
+    """Default manifest location next to the CSV."""
+    return csv_file + ".manifest.json"
+
+
+def load_manifest(path):
+    """Return the saved manifest, or None when there is none yet."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_manifest(path, manifest):
+    """Write the manifest atomically so a crash never leaves half a file."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def file_checksums(csv_file, prefix_size=None):
+    """
+    Return (sha256 of the file, sha256 of its first prefix_size bytes).
+    Both come from one pass over the file.
+    """
+    full = hashlib.sha256()
+    prefix = None
+    read = 0
+    with open(csv_file, "rb") as f:
+        while True:
+            if prefix_size is not None and prefix is None and read == prefix_size:
+                prefix = full.hexdigest()
+            size = HASH_CHUNK
+            if prefix_size is not None and prefix is None:
+                size = min(size, prefix_size - read)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            full.update(chunk)
+            read += len(chunk)
+    return full.hexdigest(), prefix
+
+
+def row_hash(name, age):
+    """Short stable hash of the non-key columns of a row."""
+    digest = hashlib.blake2b(f"{name}\x1f{age}".encode("utf-8"), digest_size=8)
+    return digest.hexdigest()
+
+
+def read_rows(csv_file, start=0):
+    """
+    Return {email: (name, age, hash)} for rows from byte offset start.
+    When an email repeats, its first row wins, as in the other loaders.
+    """
+    header = csv_stream.read_header(csv_file)
+    name_idx, email_idx, age_idx = (
+        header.index("name"), header.index("email"), header.index("age")
+    )
+    rows = {}
+    for row in csv_stream.iter_rows(csv_file, start):
+        email = row[email_idx]
+        if email in rows:
+            continue
+        name, age = row[name_idx], int(row[age_idx])
+        rows[email] = (name, age, row_hash(name, age))
+    return rows
+
+
+def diff(csv_file, manifest):
+    """
+    Compare the CSV with the manifest.
+    Returns (new, changed, deleted, hashes, checksum, size): new and
+    changed map email -> (name, age), deleted is a list of emails and
+    hashes is the email -> hash table for the next manifest. Returns
+    None when the file is unchanged.
+    """
+    size = os.path.getsize(csv_file)
+    old_size = manifest["size"] if manifest else None
+    prefix_size = old_size if old_size is not None and old_size <= size else None
+    checksum, prefix = file_checksums(csv_file, prefix_size)
+    if manifest and checksum == manifest["sha256"]:
+        return None
+
+    old_hashes = manifest["rows"] if manifest else {}
+    appended = (
+        manifest is not None
+        and prefix == manifest["sha256"]
+        and 0 < old_size < size
+        and _ends_with_newline(csv_file, old_size)
+    )
+    # Append-only files: parse just the new tail, nothing can be deleted
+    current = read_rows(csv_file, old_size if appended else 0)
+    if appended:
+        # Emails already in the old part repeat an earlier row, which wins
+        current = {
+            email: row for email, row in current.items() if email not in old_hashes
+        }
+
+    new, changed = {}, {}
+    for email, (name, age, digest) in current.items():
+        old = old_hashes.get(email)
+        if old is None:
+            new[email] = (name, age)
+        elif old != digest:
+            changed[email] = (name, age)
+
+    if appended:
+        deleted = []
+        hashes = dict(old_hashes)
+        hashes.update((email, digest) for email, (_, _, digest) in current.items())
+    else:
+        deleted = [email for email in old_hashes if email not in current]
+        hashes = {email: digest for email, (_, _, digest) in current.items()}
+    return new, changed, deleted, hashes, checksum, size
+
+
+def _ends_with_newline(csv_file, offset):
+    with open(csv_file, "rb") as f:
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
@@ -0,0 +1,237 @@
+"""
+sketches.py
+Mergeable streaming sketches for user_data aggregation in bounded
+memory: KLL for age quantiles, HyperLogLog for distinct emails and
+Space-Saving for the most frequent names. Each sketch can be fed from
+the generators in this project and merged across parallel workers.
+"""
+import hashlib
+import heapq
+import math
+import random
+
+import parallel_scan
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch. Keeps O(k) items in levels of compactors; an
+    item at level h stands for 2**h stream items. Rank error is about
+    1.7 / k with high probability.
+    """
+
+    def __init__(self, k=200, c=2.0 / 3.0, seed=None):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self.compactors = []
+        self.size = 0
+        self.max_size = 0
+        self._random = random.Random(seed)
+        self._grow()
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _capacity(self, h):
+        depth = len(self.compactors) - h - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.count += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for h, items in enumerate(self.compactors):
+            if len(items) >= self._capacity(h):
+                if h + 1 >= len(self.compactors):
+                    self._grow()
+                items.sort()
+                # Keep the odd item out at this level so no weight is lost
+                leftover = [items.pop()] if len(items) % 2 else []
+                offset = self._random.randint(0, 1)
+                self.compactors[h + 1].extend(items[offset::2])
+                self.compactors[h] = leftover
+                self.size = sum(len(level) for level in self.compactors)
+                return
+
+    def merge(self, other):
+        """Fold another KLLSketch into this one."""
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for h, items in enumerate(other.compactors):
+            self.compactors[h].extend(items)
+        self.count += other.count
+        self.size = sum(len(level) for level in self.compactors)
+        while self.size >= self.max_size:
+            self._compress()
+        return self
+
+    def quantiles(self, qs=(0.5, 0.9, 0.99)):
+        """Approximate values at the given quantiles (0..1)."""
+        weighted = sorted(
+            (value, 2 ** h)
+            for h, items in enumerate(self.compactors)
+            for value in items
+        )
+        if not weighted:
+            return {q: None for q in qs}
+        total = sum(weight for _, weight in weighted)
+        result = {}
+        for q in qs:
+            target = q * total
+            seen = 0
+            for value, weight in weighted:
+                seen += weight
+                if seen >= target:
+                    break
+            result[q] = value
+        return result
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2**p registers
+    (relative error about 1.04 / sqrt(2**p)).
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def update(self, value):
+        x = int.from_bytes(
+            hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        """Fold another HyperLogLog with the same p into this one."""
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different p")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def cardinality(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction: linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary tracking at most k items. Counts
+    overestimate by at most the smallest tracked count.
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self.counts = {}
+        self._heap = []  # (count, item); stale entries are skipped lazily
+
+    def update(self, item, weight=1):
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.k:
+            self.counts[item] = weight
+        else:
+            victim, floor = self._pop_min()
+            del self.counts[victim]
+            self.counts[item] = floor + weight
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.k:
+            self._rebuild_heap()
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def _rebuild_heap(self):
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def merge(self, other):
+        """Add another summary's counts and keep the k largest."""
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, 0) + count
+        if len(self.counts) > self.k:
+            self.counts = dict(heapq.nlargest(
+                self.k, self.counts.items(), key=lambda pair: pair[1]
+            ))
+        self._rebuild_heap()
+        return self
+
+    def top(self, n=10):
+        """The n most frequent items as (item, count) pairs."""
+        return heapq.nlargest(n, self.counts.items(), key=lambda pair: pair[1])
+
+
+class UserSketch:
+    """
+    Age quantiles, distinct emails and top names for a stream of
+    user_data rows.
+    """
+
+    def __init__(self, k=200, p=14, top_k=100):
+        self.ages = KLLSketch(k)
+        self.emails = HyperLogLog(p)
+        self.names = SpaceSaving(top_k)
+
+    def update(self, row):
+        self.ages.update(float(row["age"]))
+        self.emails.update(row["email"])
+        self.names.update(row["name"])
+
+    def update_all(self, rows):
+        for row in rows:
+            self.update(row)
+        return self
+
+    def merge(self, other):
+        self.ages.merge(other.ages)
+        self.emails.merge(other.emails)
+        self.names.merge(other.names)
+        return self
+
+    def summary(self, qs=(0.5, 0.9, 0.99), top=10):
+        return {
+            "count": self.ages.count,
+            "age_quantiles": self.ages.quantiles(qs),
+            "distinct_emails": self.emails.cardinality(),
+            "top_names": self.names.top(top),
+        }
+
+
+def sketch_users(rows, **kwargs):
+    """Build a UserSketch from any iterable of user rows, e.g. stream_users()."""
+    return UserSketch(**kwargs).update_all(rows)
+
+
+def sketch_range(key_range):
+    """Worker: sketch the users in one user_id key range."""
+    return sketch_users(parallel_scan.stream_range(key_range, "name, email, age"))
+
+
+def parallel_user_sketch(workers=4, partitions=None):
+    """Sketch the whole table with parallel_scan workers and merge the results."""
+    merged = UserSketch()
+    for partial in parallel_scan.map_ranges(
+        sketch_range, workers, partitions, ordered=False
+    ):
+        merged.merge(partial)
+    return merged
@@ -0,0 +1,113 @@
+"""
+sqlite_standin.py
+SQLite stand-in for the ALX_prodev MySQL database, used by benchmark.py
+to exercise the generators without a MySQL server. It implements just
+the subset of the mysql.connector connection and cursor API those
+modules use, translating %s placeholders to ?.
+"""
+import sqlite3
+
+CREATE_USER_DATA_SQL = """
+    CREATE TABLE IF NOT EXISTS user_data(
+        user_id CHAR(36) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        age DECIMAL NOT NULL
+    )
+"""
+
+
+def _translate(sql):
+    return sql.replace("%s", "?")
+
+
+class StandInCursor:
+    """mysql.connector-style cursor over a sqlite3 cursor."""
+
+    def __init__(self, connection, dictionary=False, **_options):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+        self.column_names = ()
+        self.rowcount = -1
+
+    def _after_execute(self):
+        description = self._cursor.description or ()
+        self.column_names = tuple(column[0] for column in description)
+        self.rowcount = self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(_translate(sql), tuple(params or ()))
+        self._after_execute()
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(_translate(sql), seq_of_params)
+        self._after_execute()
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    """mysql.connector-style connection backed by a SQLite file."""
+
+    unread_result = False
+
+    def __init__(self, path, database="ALX_prodev"):
+        self.database = database
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def cursor(self, **options):
+        return StandInCursor(self._connection, **options)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def is_connected(self):
+        return True
+
+    def reconnect(self, attempts=1, delay=0):
+        pass
+
+    def close(self):
+        self._connection.close()
+
+
+def connector(path):
+    """Return a pool connector opening StandInConnections on path."""
+    def connect(database=None, **_settings):
+        return StandInConnection(path, database)
+    return connect
+
+
+def create_user_data(path):
+    """Create an empty user_data table in the SQLite file."""
+    connection = sqlite3.connect(path)
+    connection.execute("DROP TABLE IF EXISTS user_data")
+    connection.execute(CREATE_USER_DATA_SQL)
+    connection.commit()
+    connection.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit test module for the shared connection pool in pool.py.
+"""
+
+import gc
+import os
+import socket
+import unittest
+
+import pool
+
+
+class FakeConnection:
+    """
+    Connection over one end of a socket pair. Like mysql.connector's
+    socket it shuts the socket down when closed or garbage collected,
+    which a forked process sharing the socket would see as EOF.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self.unread_result = False
+        self.in_transaction = False
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.sock.shutdown(socket.SHUT_RDWR)
+            self.sock.close()
+
+    def __del__(self):
+        if not self.closed:
+            self.sock.shutdown(socket.SHUT_RDWR)
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test class for pool.ConnectionPool"""
+
+    def setUp(self):
+        self.peers = []
+
+        def connector(**_settings):
+            ours, peer = socket.socketpair()
+            self.peers.append(peer)
+            return FakeConnection(ours)
+
+        pool.set_connector(connector)
+
+    def tearDown(self):
+        pool.set_connector(None)
+        for peer in self.peers:
+            peer.close()
+
+    def test_reuses_released_connection(self):
+        """Test that a released connection is handed out again."""
+        first = pool.connect("db")
+        connection = first._connection
+        first.close()
+        second = pool.connect("db")
+        self.assertIs(second._connection, connection)
+        second.close()
+        self.assertEqual(pool.get_pool("db").stats()["created"], 1)
+
+    def test_dropped_proxy_is_reclaimed(self):
+        """Test that a proxy collected without close() frees its slot."""
+        pool.connect("db")
+        gc.collect()
+        stats = pool.get_pool("db").stats()
+        self.assertEqual((stats["reclaimed"], stats["idle"]), (1, 1))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_fork_leaves_parent_connections_alone(self):
+        """Test that a forked child never shuts down the parent's sockets."""
+        idle = pool.connect("db")
+        held = pool.connect("db")
+        connections = [idle._connection, held._connection]
+        idle.close()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                child = pool.connect("db")
+                child.close()
+                held.close()
+                pool.get_pool("db").close_all()
+                gc.collect()
+                status = 0
+            finally:
+                os._exit(status)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        for connection, peer in zip(connections, self.peers):
+            connection.sock.sendall(b"ping")
+            peer.settimeout(1)
+            self.assertEqual(peer.recv(4), b"ping")
+        held.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit test module for incremental seeding: seed_manifest.diff and
+seed.incremental_insert_data, run against the SQLite stand-in.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import seed
+import seed_manifest
+import sqlite_standin
+
+HEADER = '"name","email","age"\n'
+
+
+def csv_line(name, email, age):
+    return f'"{name}","{email}","{age}"\n'
+
+
+class ManifestTestCase(unittest.TestCase):
+    """Writes CSVs and manifests in a temporary directory."""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.workdir, "user_data.csv")
+        self.manifest_file = seed_manifest.manifest_path(self.csv_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def write(self, *rows, mode="w"):
+        with open(self.csv_file, mode, encoding="utf-8") as f:
+            if mode == "w":
+                f.write(HEADER)
+            for row in rows:
+                f.write(csv_line(*row))
+
+    def snapshot(self):
+        """Diff against no manifest and save the result, as a load would."""
+        _, _, _, hashes, checksum, size = seed_manifest.diff(self.csv_file, None)
+        manifest = {"size": size, "sha256": checksum, "rows": hashes}
+        seed_manifest.save_manifest(self.manifest_file, manifest)
+        return manifest
+
+
+class TestDiff(ManifestTestCase):
+    """Test class for seed_manifest.diff"""
+
+    def test_unchanged_file(self):
+        """Test that an unchanged CSV needs no work."""
+        self.write(("Ann", "ann@x.com", 30), ("Bob", "bob@x.com", 40))
+        manifest = self.snapshot()
+        self.assertIsNone(seed_manifest.diff(self.csv_file, manifest))
+
+    def test_appended_tail(self):
+        """Test that appended rows are new and nothing is deleted."""
+        self.write(("Ann", "ann@x.com", 30))
+        manifest = self.snapshot()
+        self.write(("Bob", "bob@x.com", 40), mode="a")
+        new, changed, deleted, hashes, _, size = seed_manifest.diff(
+            self.csv_file, manifest
+        )
+        self.assertEqual(new, {"bob@x.com": ("Bob", 40)})
+        self.assertEqual((changed, deleted), ({}, []))
+        self.assertEqual(set(hashes), {"ann@x.com", "bob@x.com"})
+        self.assertEqual(size, os.path.getsize(self.csv_file))
+
+    def test_appended_repeat_keeps_first_row(self):
+        """Test that an appended row repeating an email is ignored."""
+        self.write(("Ann", "ann@x.com", 30))
+        manifest = self.snapshot()
+        self.write(("Annie", "ann@x.com", 31), mode="a")
+        new, changed, deleted, hashes, _, _ = seed_manifest.diff(
+            self.csv_file, manifest
+        )
+        self.assertEqual((new, changed, deleted), ({}, {}, []))
+        self.assertEqual(hashes, manifest["rows"])
+
+    def test_changed_and_deleted_rows(self):
+        """Test that edits and removals are found when the file is rewritten."""
+        self.write(("Ann", "ann@x.com", 30), ("Bob", "bob@x.com", 40),
+                   ("Cy", "cy@x.com", 50))
+        manifest = self.snapshot()
+        self.write(("Ann", "ann@x.com", 31), ("Cy", "cy@x.com", 50),
+                   ("Di", "di@x.com", 60))
+        new, changed, deleted, _, _, _ = seed_manifest.diff(self.csv_file, manifest)
+        self.assertEqual(new, {"di@x.com": ("Di", 60)})
+        self.assertEqual(changed, {"ann@x.com": ("Ann", 31)})
+        self.assertEqual(deleted, ["bob@x.com"])
+
+    def test_duplicate_email_keeps_first_row(self):
+        """Test that the first row of a repeated email wins."""
+        self.write(("Ann", "ann@x.com", 30), ("Annie", "ann@x.com", 31))
+        new, _, _, _, _, _ = seed_manifest.diff(self.csv_file, None)
+        self.assertEqual(new, {"ann@x.com": ("Ann", 30)})
+
+
+class TestIncrementalInsert(ManifestTestCase):
+    """Test class for seed.incremental_insert_data"""
+
+    def connect(self, name):
+        path = os.path.join(self.workdir, name)
+        sqlite_standin.create_user_data(path)
+        return sqlite_standin.connector(path)()
+
+    @staticmethod
+    def rows(connection):
+        cursor = connection.cursor()
+        cursor.execute("SELECT name, email, age FROM user_data ORDER BY email")
+        rows = [(name, email, int(age)) for name, email, age in cursor]
+        cursor.close()
+        return rows
+
+    def test_matches_bulk_insert(self):
+        """Test that incremental and bulk loads of one CSV agree."""
+        self.write(("Ann", "ann@x.com", 30), ("Bob", "bob@x.com", 40),
+                   ("Annie", "ann@x.com", 31))
+        bulk = self.connect("bulk.db")
+        incremental = self.connect("incremental.db")
+        seed.bulk_insert_data(bulk, self.csv_file)
+        counts = seed.incremental_insert_data(
+            incremental, self.csv_file, self.manifest_file
+        )
+        self.assertEqual(counts, (2, 0, 0))
+        self.assertEqual(self.rows(incremental), self.rows(bulk))
+
+    def test_runs_apply_only_the_difference(self):
+        """Test unchanged, appended and deleted runs against the table."""
+        connection = self.connect("users.db")
+        self.write(("Ann", "ann@x.com", 30), ("Bob", "bob@x.com", 40))
+
+        def load():
+            return seed.incremental_insert_data(
+                connection, self.csv_file, self.manifest_file
+            )
+
+        self.assertEqual(load(), (2, 0, 0))
+        self.assertEqual(load(), (0, 0, 0))
+        self.write(("Cy", "cy@x.com", 50), mode="a")
+        self.assertEqual(load(), (1, 0, 0))
+        self.write(("Ann", "ann@x.com", 30), ("Cy", "cy@x.com", 50))
+        self.assertEqual(load(), (0, 0, 1))
+        self.assertEqual(
+            self.rows(connection), [("Ann", "ann@x.com", 30), ("Cy", "cy@x.com", 50)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()